@@ -0,0 +1,205 @@
+# streaming accumulators for observables (constant work per step, bounded memory)
+
+import numpy as np
+
+class Welford:
+    """ Running mean and variance (Welford's algorithm); samples can also be removed again with pop(). """
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.M2 = 0.0 # sum of squared deviations from the mean
+
+    def push(self, x):
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.M2 += delta * (x - self.mean)
+
+    def pop(self, x):
+        """ Removes a sample that was pushed earlier. """
+        if self.n <= 1:
+            self.__init__()
+            return
+        mean_old = self.mean
+        self.n -= 1
+        self.mean = (self.n + 1) / self.n * mean_old - x / self.n
+        self.M2 = max(self.M2 - (x - mean_old) * (x - self.mean), 0.0)
+
+    @property
+    def variance(self):
+        """ Population variance (ddof=0, same as np.var). """
+        return self.M2 / self.n if self.n > 0 else 0.0
+
+    @property
+    def stddev(self):
+        return np.sqrt(self.variance)
+
+class RingBuffer:
+    """ Keeps the most recent capacity values in a preallocated array. """
+    def __init__(self, capacity, dtype=float):
+        self.data = np.zeros(capacity, dtype=dtype)
+        self.capacity = capacity
+        self.count = 0 # total number of values ever pushed
+
+    def push(self, x):
+        self.data[self.count % self.capacity] = x
+        self.count += 1
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    @property
+    def start(self):
+        """ Index (in push order) of the oldest value still held. """
+        return self.count - len(self)
+
+    def oldest(self):
+        return self.data[self.start % self.capacity]
+
+    def values(self):
+        """ The held values, oldest first. """
+        if self.count <= self.capacity: return self.data[:self.count].copy()
+        i = self.count % self.capacity
+        return np.concatenate((self.data[i:], self.data[:i]))
+
+class WindowedAccumulator:
+    """ Mean and standard deviation of the last window samples (the 'last samp_pct' estimate of a run). """
+    def __init__(self, window):
+        self.window = max(int(window), 1)
+        self.recent = RingBuffer(self.window)
+        self.stats = Welford()
+
+    def push(self, x):
+        if len(self.recent) == self.window: self.stats.pop(self.recent.oldest())
+        self.recent.push(x)
+        self.stats.push(x)
+
+    @property
+    def mean(self):
+        return self.stats.mean
+
+    @property
+    def stddev(self):
+        return self.stats.stddev
+
+class BlockingAnalyzer:
+    """ 
+    Online Flyvbjerg-Petersen blocking analysis of a correlated time series (e.g. E_ref).
+
+    Level k holds statistics of the averages of 2^k consecutive samples, so memory is O(log N). 
+    The error of the mean is read off where the blocked error estimates stop growing (the plateau).
+    """
+    def __init__(self, min_blocks=16):
+        self.min_blocks = min_blocks # levels with fewer blocks than this are too noisy to use
+        self.levels = []             # Welford statistics of the blocks at each level
+        self.pending = []            # first half of the block being built at each level (None if empty)
+
+    def push(self, x):
+        level = 0
+        while True:
+            if level == len(self.levels):
+                self.levels.append(Welford())
+                self.pending.append(None)
+            self.levels[level].push(x)
+            if self.pending[level] is None:
+                self.pending[level] = x
+                return
+            x = 0.5 * (self.pending[level] + x)
+            self.pending[level] = None
+            level += 1
+
+    @property
+    def n(self):
+        return self.levels[0].n if self.levels else 0
+
+    @property
+    def mean(self):
+        return self.levels[0].mean if self.levels else np.nan
+
+    def errors(self):
+        """ Standard error of the mean estimated at every level with at least min_blocks blocks. """
+        return [np.sqrt(level.variance / (level.n - 1)) for level in self.levels if level.n >= max(self.min_blocks, 2)]
+
+    @property
+    def plateau_level(self):
+        """ 
+        First level whose error agrees with the next level's within its own uncertainty, or None when the errors 
+        are still growing at the last usable level (the series is too short for its autocorrelation time).
+        """
+        errors = self.errors()
+        for k in range(len(errors) - 1):
+            error_of_error = errors[k] / np.sqrt(2 * (self.levels[k].n - 1))
+            if errors[k+1] - errors[k] < error_of_error: return k
+        return None
+
+    @property
+    def converged(self):
+        """ True once the blocked errors have reached a plateau, i.e. error and tau_int can be trusted. """
+        return self.plateau_level is not None
+
+    @property
+    def error(self):
+        """ Autocorrelation-aware standard error of the mean (nan until the blocked errors reach a plateau). """
+        k = self.plateau_level
+        return self.errors()[k] if k is not None else np.nan
+
+    @property
+    def error_lower_bound(self):
+        """ Largest blocked error so far: the true error is at least this large even before convergence (nan without data). """
+        errors = self.errors()
+        return max(errors) if errors else np.nan
+
+    @property
+    def tau_int(self):
+        """ Integrated autocorrelation time in samples (0.5 for uncorrelated data; nan until converged). """
+        errors, k = self.errors(), self.plateau_level
+        if k is None or errors[0] == 0: return np.nan
+        return 0.5 * (errors[k] / errors[0])**2
+
+class DriftDetector:
+    """ 
+    Equilibration test for a time series: compares the means of the older and newer halves of the last 2*window samples.
+
+    The error of each half-mean comes from batch means, which keeps the test honest for correlated data like E_ref.
+    The series is considered equilibrated once the two halves agree within z combined standard errors.
+    """
+    def __init__(self, window=100, batches=5, z=2.0):
+        self.window = window
+        self.batches = batches
+        self.z = z
+        self.recent = RingBuffer(2 * window)
+
+    def push(self, x):
+        self.recent.push(x)
+
+    @property
+    def equilibrated(self):
+        if len(self.recent) < self.recent.capacity: return False
+        old, new = self.recent.values().reshape(2, self.batches, -1).mean(axis=2)
+        stderr2 = (old.var(ddof=1) + new.var(ddof=1)) / self.batches
+        return abs(new.mean() - old.mean()) < self.z * np.sqrt(stderr2)
+
+class Histogram:
+    """ Fixed-range histogram accumulated over many steps with vectorized bincount updates. """
+    def __init__(self, bins, lo, hi):
+        self.bins = bins
+        self.lo = float(lo)
+        self.hi = float(hi)
+        self.width = (self.hi - self.lo) / bins
+        self.counts = np.zeros(bins, dtype=np.int64)
+        self.total = 0 # all samples pushed, including those outside [lo, hi)
+
+    def push(self, values):
+        idx = np.floor((np.ravel(values) - self.lo) / self.width).astype(np.int64)
+        inside = (idx >= 0) & (idx < self.bins)
+        self.counts += np.bincount(idx[inside], minlength=self.bins)
+        self.total += idx.size
+
+    @property
+    def centers(self):
+        return self.lo + self.width * (np.arange(self.bins) + 0.5)
+
+    def density(self):
+        """ Normalized density (integrates to the fraction of samples inside [lo, hi)); returns (centers, density). """
+        if self.total == 0: return self.centers, np.zeros(self.bins)
+        return self.centers, self.counts / (self.total * self.width)
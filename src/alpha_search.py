@@ -0,0 +1,63 @@
+# optimizer-driven search for the E_ref feedback parameter alpha (used by qmc_cli.py --alpha-search)
+#
+# Instead of a simulation for every point of a fine grid, AlphaSearch evaluates a coarse grid, brackets the best grid
+# point and refines the bracket by golden-section search. Every alpha is simulated at most once (results are memoized),
+# and the caller is expected to run all candidates with the same random stream and from the same equilibrated walkers,
+# so the differences between candidates come from alpha and not from the noise.
+
+import numpy as np
+
+GOLDEN = (np.sqrt(5) - 1) / 2 # 0.618...
+
+class AlphaSearch:
+    """
+    Minimizes score(result) over alpha in [lo, hi].
+    run(alphas) simulates a list of alphas (in one batch) and returns one result per alpha; score maps a result to the
+    number being minimized, e.g. |E_0 - target| or the population fluctuation.
+    """
+    def __init__(self, run, score, lo=0.1, hi=1.0, grid=9, tol=0.005, digits=10):
+        self.run = run
+        self.score = score
+        self.lo, self.hi = lo, hi
+        self.grid = grid
+        self.tol = tol
+        self.digits = digits
+        self.results = {} # alpha (rounded to digits) -> result of run
+
+    def evaluate(self, alphas):
+        """ Results for alphas, simulating only the ones not seen before (all in one call to run). """
+        alphas = [round(float(alpha), self.digits) for alpha in alphas]
+        todo = list(dict.fromkeys(alpha for alpha in alphas if alpha not in self.results))
+        if todo: self.results.update(zip(todo, self.run(todo)))
+        return [self.results[alpha] for alpha in alphas]
+
+    def f(self, alpha):
+        return self.score(self.evaluate([alpha])[0])
+
+    def search(self):
+        """ Returns the alpha with the lowest score among everything evaluated by the coarse grid and the refinement. """
+        grid = np.linspace(self.lo, self.hi, self.grid)
+        scores = [self.score(result) for result in self.evaluate(grid)]
+        best = int(np.argmin(scores))
+        a, b = grid[max(best - 1, 0)], grid[min(best + 1, len(grid) - 1)]
+
+        # golden-section search on the bracket around the best grid point
+        c, d = b - GOLDEN * (b - a), a + GOLDEN * (b - a)
+        f_c, f_d = self.f(c), self.f(d)
+        while b - a > self.tol:
+            if f_c < f_d:
+                b, d, f_d = d, c, f_c
+                c = b - GOLDEN * (b - a)
+                f_c = self.f(c)
+            else:
+                a, c, f_c = c, d, f_d
+                d = a + GOLDEN * (b - a)
+                f_d = self.f(d)
+
+        # the objective is noisy, so trust the best point actually simulated rather than the final bracket
+        return min(self.results, key=lambda alpha: self.score(self.results[alpha]))
+
+    @property
+    def evaluations(self):
+        """ Number of distinct alphas simulated so far. """
+        return len(self.results)
@@ -0,0 +1,281 @@
+# compute backends for QMC.step
+#
+#   * NumpyBackend: the reference implementation, runs the vectorized QMC methods phase by phase
+#   * JitBackend:   compiled loops over walkers using Numba (optional dependency); walk and energy are fused
+#                   into one pass, branching into another (E_ref needs the population average in between)
+#   * ParallelBackend: the walker arrays live in shared memory and are split across a pool of worker processes
+#
+# Every backend lists its step as named phases (see phases); QMC.step times them one by one when observers are attached.
+
+import importlib.util
+import warnings
+import numpy as np
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+
+HAVE_NUMBA = importlib.util.find_spec("numba") is not None # numba itself is only imported when a jit backend is built
+_kernels = None # (walk_energy, branch) once compiled by _jit_kernels
+
+BACKENDS = ("numpy", "jit", "parallel")
+
+class NumpyBackend:
+    """ Reference backend: Walk -> Calculate_V_tots -> Calculate_E_ref -> Branch -> CullDeadReplicas -> CountReplicas """
+    name = "numpy"
+
+    def __init__(self, qmc):
+        pass
+
+    def phases(self, qmc):
+        """ The step as a list of (name, callable) pairs, run in order. """
+        return [("Walk", qmc.Walk), 
+                ("Calculate_V_tots", qmc.Calculate_V_tots), # the only potential evaluation of the step
+                ("Calculate_E_ref", qmc.Calculate_E_ref), 
+                ("Branch", qmc.Branch), 
+                ("CullDeadReplicas", qmc.CullDeadReplicas), 
+                ("CountReplicas", qmc.CountReplicas)]
+
+    def step(self, qmc):
+        for _, phase in self.phases(qmc): phase()
+
+    def close(self):
+        pass
+
+def _jit_kernels():
+    """ Imports numba and defines the jit kernels on first use; returns (walk_energy, branch). """
+    global _kernels
+    if _kernels is not None: return _kernels
+    import numba
+
+    @numba.njit(cache=True)
+    def _jit_walk_energy(rng, xs, V_tots, N, delta_tau, V0, R2):
+        """ Walks every replica and evaluates its total V_Gauss potential in the same loop. """
+        prefactor = np.sqrt(delta_tau)
+        k = xs.shape[1]
+        for w in range(N):
+            for i in range(k):
+                xs[w, i] += prefactor * rng.standard_normal()
+            V_tot = 0.0
+            for i in range(k):
+                V_tot += V0 * np.exp(-xs[w, i]**2 / R2) # directly stored relative distance
+                for j in range(i+1, k):
+                    derived_distance = xs[w, i] - xs[w, j]
+                    V_tot += V0 * np.exp(-derived_distance**2 / R2)
+            V_tots[w] = V_tot
+
+    @numba.njit(cache=True)
+    def _jit_branch(rng, xs, V_tots, xs_out, V_tots_out, m_n, N, capacity, dtau_over_hbar, E_ref):
+        """ Birth/death with the same capacity rule as QMC.Branch; returns (replicas written, copies dropped). """
+        survivors = 0
+        extra_total = 0
+        for w in range(N):
+            W = 1 - (V_tots[w] - E_ref) * dtau_over_hbar # eqn 2.29
+            m = min(max(int(W + rng.random()), 0), 3)
+            m_n[w] = m
+            if m > 0:
+                survivors += 1
+                extra_total += m - 1
+
+        room = capacity - survivors
+        overflow = max(extra_total - room, 0)
+        n = 0
+        for w in range(N):
+            if m_n[w] == 0: continue
+            copies = min(m_n[w] - 1, room)
+            room -= copies
+            for c in range(copies + 1):
+                xs_out[n, :] = xs[w, :]
+                V_tots_out[n] = V_tots[w]
+                n += 1
+        return n, overflow
+
+    _kernels = (_jit_walk_energy, _jit_branch)
+    return _kernels
+
+class JitBackend:
+    """ 
+    Numba backend for the V_Gauss potential. 
+    Draws come from qmc.rng in the same order as the numpy backend; only the order of floating-point sums differs,
+    so runs agree with the numpy backend statistically (and almost always bit-for-bit).
+    """
+    name = "jit"
+
+    def __init__(self, qmc):
+        V = getattr(qmc.V, "exact", qmc.V) # the kernel evaluates V_Gauss analytically, so any table is bypassed
+        self.V0 = float(V.V0)
+        self.R2 = float(V.R2)
+        self.m_n = np.zeros(qmc.capacity, dtype=np.int64)
+        self.walk_energy, self.branch_kernel = _jit_kernels()
+
+    def walk(self, qmc):
+        self.walk_energy(qmc.rng, qmc.xs, qmc.V_tots, qmc.N, qmc.delta_tau, self.V0, self.R2)
+
+    def branch(self, qmc):
+        from model import hbar
+        N_filled, overflow = self.branch_kernel(qmc.rng, qmc.xs, qmc.V_tots, qmc.xs_spare, qmc.V_tots_spare, self.m_n, 
+                                                qmc.N, qmc.capacity, qmc.delta_tau/hbar, qmc.E_ref)
+        qmc.deaths = int(np.count_nonzero(self.m_n[:qmc.N] == 0))
+        qmc.births = N_filled - (qmc.N - qmc.deaths)
+        qmc.dropped = overflow
+        qmc.N_filled = N_filled
+        qmc.N_overflow += overflow
+        qmc.xs, qmc.xs_spare = qmc.xs_spare, qmc.xs
+        qmc.V_tots, qmc.V_tots_spare = qmc.V_tots_spare, qmc.V_tots
+
+    def phases(self, qmc):
+        return [("Walk+Calculate_V_tots", lambda: self.walk(qmc)), 
+                ("Calculate_E_ref", qmc.Calculate_E_ref), 
+                ("Branch", lambda: self.branch(qmc)), 
+                ("CullDeadReplicas", qmc.CullDeadReplicas), 
+                ("CountReplicas", qmc.CountReplicas)]
+
+    def step(self, qmc):
+        for _, phase in self.phases(qmc): phase()
+
+    def close(self):
+        pass
+
+BLOCK = 512 # rows per block; every block of every step gets its own child stream of qmc.rng, so results do not depend on the worker count
+
+_shard = None # per-worker state: a small QMC whose arrays are pointed at one block of shared memory at a time
+
+def _attach(names, capacity, shape, params):
+    """ Pool initializer: maps the shared walker arrays into this worker and builds its shard QMC. """
+    global _shard
+    from model import QMC
+    shms = [SharedMemory(name=name) for name in names]
+    _shard = dict(shms=shms, 
+                  xs=[np.ndarray((capacity, *shape), buffer=shms[0].buf), np.ndarray((capacity, *shape), buffer=shms[1].buf)], 
+                  V_tots=[np.ndarray(capacity, buffer=shms[2].buf), np.ndarray(capacity, buffer=shms[3].buf)], 
+                  m_n=np.ndarray(capacity, dtype=np.int64, buffer=shms[4].buf), 
+                  u=np.ndarray(capacity, buffer=shms[5].buf), 
+                  qmc=QMC(min_replicas=1, max_replicas=1, **params))
+
+def _block_rng(seed_seq, step, block):
+    """ Generator for one block of one step, derived from the simulation's SeedSequence. """
+    entropy, spawn_key, bit_generator = seed_seq
+    child = np.random.SeedSequence(entropy, spawn_key=(*spawn_key, step, block))
+    return np.random.Generator(getattr(np.random, bit_generator)(child))
+
+def _walk_blocks(task):
+    """ 
+    Walks this worker's blocks and evaluates their potential (local energy); the block's stream then also draws
+    the uniforms Branch needs, so each block builds one Generator per step.
+    """
+    current, blocks, seed_seq, step = task
+    qmc = _shard["qmc"]
+    xs, V_tots, u = _shard["xs"][current], _shard["V_tots"][current], _shard["u"]
+    for block, lo, hi in blocks:
+        qmc.xs, qmc.V_tots, qmc.N = xs[lo:hi], V_tots[lo:hi], hi - lo
+        qmc.rng = _block_rng(seed_seq, step, block)
+        qmc.Walk()
+        qmc.Calculate_V_tots()
+        u[lo:hi] = qmc.rng.random(size=hi - lo)
+
+def _gather(task):
+    """ Copies every replica in rows [lo, hi) m_n times into the other buffer, starting at row out. """
+    current, lo, hi, out = task
+    xs, V_tots = _shard["xs"], _shard["V_tots"]
+    parents = np.repeat(np.arange(lo, hi), _shard["m_n"][lo:hi])
+    np.take(xs[current], parents, axis=0, out=xs[1 - current][out:out + len(parents)])
+    np.take(V_tots[current], parents, out=V_tots[1 - current][out:out + len(parents)])
+
+class ParallelBackend:
+    """ 
+    Splits one walker population across a pool of worker processes that share the walker arrays.
+
+    Each step the alive rows are cut into blocks of BLOCK rows, dealt out to the workers in contiguous shards.
+    There are two round trips to the pool per step:
+      1. workers walk their blocks, evaluate the potential (local energy) and draw the branching uniforms
+      2. the coordinator updates E_ref (eqn 2.35), turns the uniforms into multiplicities (QMC.BranchMultiplicities), 
+         applies the capacity cap and assigns output offsets; workers gather their shard into the spare buffer
+    The output is compact, so the next step's shards are balanced again automatically.
+    """
+    name = "parallel"
+
+    def __init__(self, qmc):
+        self.workers = max(int(qmc.workers), 1)
+        shape = qmc.walker_shape
+        sizes = [qmc.xs.nbytes] * 2 + [qmc.capacity * 8] * 4
+        self.shms = [SharedMemory(create=True, size=max(size, 1)) for size in sizes]
+        xs = [np.ndarray((qmc.capacity, *shape), buffer=shm.buf) for shm in self.shms[:2]]
+        V_tots = [np.ndarray(qmc.capacity, buffer=shm.buf) for shm in self.shms[2:4]]
+        self.m_n = np.ndarray(qmc.capacity, dtype=np.int64, buffer=self.shms[4].buf)
+        self.u = np.ndarray(qmc.capacity, buffer=self.shms[5].buf)
+        xs[0][:], V_tots[0][:] = qmc.xs, qmc.V_tots
+        self.xs, self.V_tots, self.current = xs, V_tots, 0
+        qmc.xs, qmc.xs_spare, qmc.V_tots, qmc.V_tots_spare = xs[0], xs[1], V_tots[0], V_tots[1]
+
+        params = dict(V=qmc.V, particle_count=qmc.particle_count, delta_tau=qmc.delta_tau, trial=qmc.trial, pair_cutoff=qmc.pair_cutoff, 
+                      dim=qmc.dim)
+        self.pool = Pool(self.workers, initializer=_attach, initargs=([shm.name for shm in self.shms], qmc.capacity, shape, params))
+
+    def shards(self, N):
+        """ The blocks of N rows, split into one contiguous list of (block, lo, hi) per worker. """
+        blocks = [(b, lo, min(lo + BLOCK, N)) for b, lo in enumerate(range(0, N, BLOCK))]
+        return [[blocks[b] for b in shard] for shard in np.array_split(np.arange(len(blocks)), self.workers) if len(shard)]
+
+    def walk(self, qmc):
+        seed_seq = qmc.rng.bit_generator.seed_seq
+        seed_seq = (seed_seq.entropy, tuple(seed_seq.spawn_key), qmc.bit_generator)
+        self.shard_rows = self.shards(qmc.N)
+        self.pool.map(_walk_blocks, [(self.current, blocks, seed_seq, qmc.step_count) for blocks in self.shard_rows])
+
+    def branch(self, qmc):
+        m_n = qmc.CapMultiplicities(qmc.BranchMultiplicities(self.u[:qmc.N]))
+        self.m_n[:qmc.N] = m_n
+        ends = np.cumsum(m_n)
+        tasks = []
+        for blocks in self.shard_rows:
+            lo, hi = blocks[0][1], blocks[-1][2]
+            tasks.append((self.current, lo, hi, int(ends[lo - 1]) if lo else 0))
+        self.pool.map(_gather, tasks)
+
+        qmc.N_filled = int(ends[-1]) if len(ends) else 0
+        self.current = 1 - self.current
+        qmc.xs, qmc.xs_spare = self.xs[self.current], self.xs[1 - self.current]
+        qmc.V_tots, qmc.V_tots_spare = self.V_tots[self.current], self.V_tots[1 - self.current]
+
+    def phases(self, qmc):
+        return [("Walk+Calculate_V_tots", lambda: self.walk(qmc)), 
+                ("Calculate_E_ref", qmc.Calculate_E_ref), 
+                ("Branch", lambda: self.branch(qmc)), 
+                ("CullDeadReplicas", qmc.CullDeadReplicas), 
+                ("CountReplicas", qmc.CountReplicas)]
+
+    def step(self, qmc):
+        for _, phase in self.phases(qmc): phase()
+
+    def close(self):
+        """ Stops the workers and frees the shared memory (the QMC keeps private copies of its arrays). """
+        if self.pool is None: return
+        self.pool.close()
+        self.pool.join()
+        self.pool = None
+        self.xs = self.V_tots = self.m_n = self.u = None
+        for shm in self.shms:
+            shm.close()
+            shm.unlink()
+
+def make_backend(name, qmc):
+    """ Returns the backend called name for qmc, falling back to the numpy backend when 'jit' cannot be used. """
+    if name not in BACKENDS: raise ValueError(f"Unknown backend '{name}', expected one of {BACKENDS}")
+
+    if name == "jit":
+        from utils.potential import V_Gauss
+        if not HAVE_NUMBA:
+            warnings.warn("numba is not installed, falling back to the numpy backend")
+        elif qmc.dim > 1:
+            warnings.warn("the jit backend only supports dim=1, falling back to the numpy backend")
+        elif qmc.pair_cutoff is not None:
+            warnings.warn("the jit backend evaluates every pair and does not support pair_cutoff, falling back to the numpy backend")
+        elif qmc.trial is not None:
+            warnings.warn("the jit backend does not support importance sampling, falling back to the numpy backend")
+        elif not isinstance(getattr(qmc.V, "exact", qmc.V), V_Gauss):
+            warnings.warn(f"the jit backend only supports V_Gauss (got {qmc.V!r}), falling back to the numpy backend")
+        else:
+            return JitBackend(qmc)
+
+    if name == "parallel":
+        return ParallelBackend(qmc)
+
+    return NumpyBackend(qmc)
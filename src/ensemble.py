@@ -0,0 +1,136 @@
+# many independent simulations of the same system, stepped together
+#
+# QMCEnsemble holds K configurations that differ only in scalar parameters (alpha, seed/spawn_key, delta_tau and, for
+# V_Gauss, V0 and R). Their walkers share one array with an extra leading axis, shape (K, capacity, *walker_shape),
+# so one step evaluates the potential, updates E_ref and branches for all K configurations with a handful of NumPy calls.
+# Only the random draws loop over the configurations: each one keeps its own Generator, so a configuration's stream
+# does not depend on which other configurations share the ensemble.
+
+import numpy as np
+from model import QMC, hbar, pair_distances
+
+STACKED_FIELDS = ("alpha", "seed", "spawn_key", "delta_tau", "V0", "R") # per-configuration parameters
+
+class QMCEnsemble:
+    """
+    K plain DMC simulations (no trial wave function) advanced in lockstep by step().
+    configs is a list of dicts using the keys in STACKED_FIELDS; missing keys take the QMC defaults (V0 and R: from V).
+    After each step E_ref, N and N_prev hold one value per configuration.
+    walkers optionally gives a population (rows of relative coordinates) every configuration starts from instead of the origin,
+    e.g. one that is already equilibrated; it is tiled or truncated to min_replicas rows.
+    """
+    def __init__(self, V, configs, particle_count=2, min_replicas=1000, max_replicas=20000, bit_generator="PCG64", walkers=None, dim=1):
+        if V is None: raise ValueError("Potential function V(x) must be provided")
+        if particle_count < 2: raise ValueError("There should be at least 2 particles")
+        configs = [dict(config) for config in configs]
+        for config in configs:
+            unknown = set(config) - set(STACKED_FIELDS)
+            if unknown: raise ValueError(f"Only {STACKED_FIELDS} can differ between configurations, got {sorted(unknown)}")
+
+        defaults = QMC.model_fields
+        self.K = len(configs)
+        self.particle_count = particle_count
+        self.dim = dim
+        self.walker_shape = (particle_count-1,) if dim == 1 else (particle_count-1, dim) # as QMC.walker_shape
+        self.capacity = max(min_replicas, max_replicas)
+        self.alpha = np.array([config.get("alpha", defaults["alpha"].default) for config in configs], dtype=float)
+        self.delta_tau = np.array([config.get("delta_tau", defaults["delta_tau"].default) for config in configs], dtype=float)
+        self.rngs = [np.random.Generator(getattr(np.random, bit_generator)(
+                         np.random.SeedSequence(config.get("seed", defaults["seed"].default), spawn_key=tuple(config.get("spawn_key", ())))))
+                     for config in configs]
+        self.V = self.stacked_potential(V, configs)
+
+        self.xs = np.zeros((self.K, self.capacity, *self.walker_shape))
+        if walkers is not None: self.xs[:, :min_replicas] = np.asarray(walkers, dtype=float)[np.arange(min_replicas) % len(walkers)]
+        self.V_tots = np.zeros((self.K, self.capacity))
+        self.xs_spare = np.zeros_like(self.xs)
+        self.V_tots_spare = np.zeros_like(self.V_tots)
+        self.N = np.full(self.K, min_replicas)
+        self.N_prev = self.N.copy()
+        self.N_target = min_replicas
+        self.N_overflow = np.zeros(self.K, dtype=int)
+        self.step_count = 0
+        self.E_ref = None
+
+        self.Calculate_V_tots()
+        self.Calculate_E_ref()
+
+    def stacked_potential(self, V, configs):
+        """ V itself, or a V_Gauss whose V0 and R are (K, 1, 1) arrays when some configuration changes them. """
+        if not any("V0" in config or "R" in config for config in configs): return V
+
+        from utils.potential import V_Gauss
+        exact = getattr(V, "exact", V)
+        if not isinstance(exact, V_Gauss): raise ValueError(f"V0 and R can only vary for V_Gauss (got {V!r})")
+        V0 = np.array([config.get("V0", exact.V0) for config in configs], dtype=float)
+        R = np.array([config.get("R", exact.R) for config in configs], dtype=float)
+        return V_Gauss(exact.sys, V0[:, np.newaxis, np.newaxis], R[:, np.newaxis, np.newaxis])
+
+    @property
+    def alive(self):
+        """ Mask of shape (K, N_max) that is True for the alive rows of each configuration. """
+        return np.arange(self.N.max()) < self.N[:, np.newaxis]
+
+    def Walk(self):
+        """ Gaussian step for every alive walker, each configuration drawing from its own Generator. """
+        for c, rng in enumerate(self.rngs):
+            self.xs[c, :self.N[c]] += np.sqrt(self.delta_tau[c]) * rng.standard_normal(size=(self.N[c], *self.walker_shape))
+
+    def Calculate_V_tots(self):
+        """ Total potential of every alive walker of every configuration in one call to V (dead rows are zeroed). """
+        N_max = self.N.max()
+        distances = pair_distances(self.xs[:, :N_max].reshape(self.K * N_max, *self.walker_shape)).reshape(self.K, N_max, -1)
+        self.V_tots[:, :N_max] = np.where(self.alive, self.V(distances).sum(axis=2), 0.0)
+
+    def Calculate_E_ref(self):
+        """ eqn 2.33 for the first step, then eqn 2.35 with each configuration's own alpha. """
+        if np.any(self.N == 0): raise ValueError(f"No alive replicas found in configurations {np.flatnonzero(self.N == 0).tolist()}")
+        V_avg = self.V_tots[:, :self.N.max()].sum(axis=1) / self.N
+        if self.E_ref is None: self.E_ref = V_avg # eqn 2.33
+        else: self.E_ref = V_avg - self.alpha * (1 - self.N / self.N_prev) # eqn 2.35
+
+    def BranchMultiplicities(self):
+        """ m_n = min[W(x) + u_n, 3] for every alive walker (eqn 2.29); dead rows get 0. """
+        N_max = self.N.max()
+        u = np.zeros((self.K, N_max))
+        for c, rng in enumerate(self.rngs):
+            u[c, :self.N[c]] = rng.random(size=self.N[c])
+        W = 1 - (self.V_tots[:, :N_max] - self.E_ref[:, np.newaxis]) * (self.delta_tau / hbar)[:, np.newaxis]
+        return np.where(self.alive, np.clip((W + u).astype(int), 0, 3), 0)
+
+    def CapMultiplicities(self, m_n):
+        """ Same rule as QMC.CapMultiplicities, applied to each configuration: copies past capacity are dropped from the end. """
+        extra = np.maximum(m_n - 1, 0)
+        room = self.capacity - np.count_nonzero(m_n, axis=1)
+        self.N_overflow += np.maximum(extra.sum(axis=1) - room, 0)
+        # a no-op for configurations that fit: there the running total of copies never exceeds room
+        extra = np.minimum(extra, np.maximum(room[:, np.newaxis] - (np.cumsum(extra, axis=1) - extra), 0))
+        return np.minimum(m_n, 1) + extra
+
+    def GatherReplicas(self, m_n):
+        """ Copies every walker m_n times into the front of its configuration's spare rows with one gather, then swaps buffers. """
+        K, N_max = m_n.shape
+        N = m_n.sum(axis=1)
+        # parents as flat row numbers into (K * capacity) rows; each configuration's output starts at its own row 0
+        parents = np.repeat(((np.arange(K) * self.capacity)[:, np.newaxis] + np.arange(N_max)).ravel(), m_n.ravel())
+        dest = np.arange(len(parents)) + np.repeat(np.arange(K) * self.capacity - (np.cumsum(N) - N), N)
+        self.xs_spare.reshape(-1, *self.walker_shape)[dest] = self.xs.reshape(-1, *self.walker_shape)[parents]
+        self.V_tots_spare.reshape(-1)[dest] = self.V_tots.reshape(-1)[parents]
+        self.xs, self.xs_spare = self.xs_spare, self.xs
+        self.V_tots, self.V_tots_spare = self.V_tots_spare, self.V_tots
+        self.N_prev, self.N = self.N, N
+
+    def Branch(self):
+        self.GatherReplicas(self.CapMultiplicities(self.BranchMultiplicities()))
+
+    def step(self):
+        """ Steps all K simulations forward one delta-t step (the QMC phases, each batched over the configurations). """
+        self.Walk()
+        self.Calculate_V_tots()
+        self.Calculate_E_ref()
+        self.Branch()
+        self.step_count += 1
+
+    def centroids(self, c):
+        """ Centroid of each alive walker of configuration c (see QMC.centroids). """
+        return self.xs[c, :self.N[c]].sum(axis=1) / self.particle_count
@@ -1,16 +1,45 @@
 import numpy as np
-import scipy.constants as const
+import json
+import os
+import pickle
+import time
 from pydantic import BaseModel, conlist
 from typing import List, Union, Callable, Any, Optional
+from backends import make_backend
+from tabulated import tabulate
 
 hbar = 1
+CHECKPOINT_FIELDS = ("particle_count", "dim", "min_replicas", "max_replicas", "delta_tau", "xmin", "xmax", "bins", "seed", 
+                     "spawn_key", "bit_generator", "mass", "alpha", "backend", "tabulate_V", "V_tol", "pair_cutoff")  # configuration written to (and restored from) checkpoints
 docs = """
 11/30/2023 Changes (mostly for readability):
    * Added Replica class that keeps track of the state of each replica
    * Removed fixed array of replicas, now has initial value of min_replicas (target replicas)
    * Added N_target to be explicit about
    * Cull dead replicas from the array at the end of each step
+
+Array-backed ensemble:
+   * Walkers live in one contiguous array xs of shape (capacity, particle_count-1); rows [0, N) are alive
+   * Walk draws all of its Gaussian steps in one batched call
+   * Replica is only built on demand (see QMC.replicas) for debugging
+   * Branch is vectorized: one multiplicity array, then a single gather into a spare buffer sized to max_replicas
+   * Copies that would overflow max_replicas are dropped deterministically and counted in N_overflow
+   * With dim > 1 every walker holds particle_count-1 relative position vectors: xs has shape (capacity, particle_count-1, dim)
+     and V is evaluated on the Euclidean pair distances
 """
+
+def pair_distances(xs):
+    """ 
+    The distances of every pair of particles for each walker in xs, shape (replicas, pairs).
+    The directly stored relative coordinates x_i (particle i+1 to particle 0) come first, then the derived x_i - x_j for i < j.
+    In 1D (xs of shape (replicas, particle_count-1)) the distances are signed; for xs of shape (replicas, particle_count-1, dim)
+    they are the Euclidean lengths of the relative vectors, computed for all pairs and dimensions in one pass.
+    """
+    i, j = np.triu_indices(xs.shape[1], k=1)
+    distances = np.concatenate((xs, xs[:, i] - xs[:, j]), axis=1)
+    if xs.ndim == 3: distances = np.sqrt((distances**2).sum(axis=2))
+    return distances
+
 class Replica(BaseModel):
     alive: bool = False
     xs_array: conlist(float, min_length=0) = []
@@ -22,7 +51,7 @@ class Replica(BaseModel):
 class QMC(BaseModel):
     V: Callable[[float], float] = None     # potential function V(x) associated with the specific quantum system we are modeling
     particle_count: int = 2                # number of particles to simulate
-    dim: int = 1                   # number of dimensions (number of spatial dimensions = 1 x number of particles)
+    dim: int = 1                   # number of spatial dimensions; with dim > 1 each relative coordinate is a dim-vector
     min_replicas: int = 1000       # minimum number of replicas
     max_replicas: int = 20000      # maximum number of replicas
     delta_tau: float = 0.1         # time step size (Δτ = 0.1)
@@ -30,31 +59,59 @@ class QMC(BaseModel):
     xmax: float = 20               # maximum value of the spatial coordinate (xmax = 20)
     bins: int = 200                # number of spatial bins for sorting the replicas (only used during 'Counting' to plot the ground state wave function)
     seed: int = 42                 # seed value for the random number generators (for repeatability)
+    spawn_key: tuple = ()          # SeedSequence spawn key; child i of a run seeded with seed has spawn_key (i,) (see sweep.spawn_keys)
+    bit_generator: str = "PCG64"   # numpy bit generator behind rng (PCG64, PCG64DXSM, Philox, SFC64, MT19937)
+    rng: Any = None                # this simulation's numpy.random.Generator, built from SeedSequence(seed, spawn_key)
     mass: float = 1                # mass of the particle (m = 1)
     E_ref: float = None            # reference energy (E_ref = 0)
        
     DEBUG: bool = False            # debug flag
-    # replicas: Optional[List[List[Union[bool, float]]]] = None
-    replicas: List[Replica] = None
+    xs: Any = None                 # walker ensemble, shape (capacity, *walker_shape); rows [0, N_filled) are alive
+    V_tots: Any = None             # cached total potential (local energy with a trial) per row of xs (refreshed once per step by Calculate_V_tots)
+    xs_spare: Any = None           # preallocated buffers Branch gathers survivors into (swapped with xs / V_tots)
+    V_tots_spare: Any = None
+    capacity: int = None           # number of rows allocated in xs (fixed at max_replicas, never grows)
+    N_filled: int = 0              # number of rows of xs in use
+    N_overflow: int = 0            # total number of copies dropped because the population hit capacity
+    step_count: int = 0            # number of completed steps
+    births: int = 0                # copies created by the last Branch
+    deaths: int = 0                # replicas killed by the last Branch
+    dropped: int = 0               # copies the last Branch dropped at capacity
+    observers: List[Any] = []      # objects notified as each step runs (see add_observer and telemetry.py)
     
     N: int = 500                   # the count of ALIVE replicas; initially equal to min_replicas
     N_prev: int = 500              # the count of ALIVE replicas from the previous step
     N_target: int = 500            # the target number of replicas (initially equal to min_replicas)
     alpha: float = 0.2             # Used in our modified E_ref calculation
+    backend: str = "numpy"         # compute backend for step(): 'numpy' (reference) or 'jit' (Numba, falls back to 'numpy' if unavailable)
+    engine: Any = None             # the backend object that runs step() (see backends.py)
+    workers: int = 1               # worker processes sharing the population (parallel backend only)
+    tabulate_V: bool = False       # replace V by a table over [xmin, xmax] (exact V is still used outside that range)
+    V_tol: float = 1e-6            # largest interpolation error allowed when tabulating V
+    trial: Any = None              # trial wave function for importance sampling (see trial_wavefunction.py); None = plain DMC
+    pair_cutoff: Optional[float] = None  # only pairs closer than this contribute to the potential (None = every pair; V must be even)
+    pair_cutoff_error: float = 0.0 # bound on the potential each walker loses to pair_cutoff (set in __init__ from the tail of V)
 
     def __init__(self, **data):
         """ initialize the simulation based on input values (things are implicitly set via the super class __init__)"""
         super().__init__(**data)  # Call the super class __init__
 
         if self.V is None: raise ValueError("Potential function V(x) must be provided, dammit")
-        np.random.seed(seed=self.seed)
-
-        xs_array = [0.0 for _ in range(self.particle_count-1)]
+        if self.dim < 1: raise ValueError("dim must be at least 1")
+        if self.pair_cutoff is not None and self.dim > 1: raise ValueError("pair_cutoff is only supported for dim=1")
+        if self.tabulate_V: self.V = tabulate(self.V, self.xmin, self.xmax, tol=self.V_tol)
+        if self.pair_cutoff is not None: self.pair_cutoff_error = self.cutoff_error_bound()
+        if self.rng is None:
+            seed_seq = np.random.SeedSequence(self.seed, spawn_key=tuple(self.spawn_key))
+            self.rng = np.random.Generator(getattr(np.random, self.bit_generator)(seed_seq))
 
-        # replicas array contains live replicas (the dead are culled at the end of each step)
-        self.replicas = [Replica(alive=True, 
-                                 last_particle_pos=0.0, 
-                                 xs_array=xs_array) for i in range(self.min_replicas)]
+        # walker array contains live replicas in rows [0, N) (the dead are culled at the end of each step)
+        self.capacity = max(self.min_replicas, self.max_replicas)
+        self.xs = np.zeros((self.capacity, *self.walker_shape))
+        self.V_tots = np.zeros(self.capacity)
+        self.xs_spare = np.zeros_like(self.xs)
+        self.V_tots_spare = np.zeros_like(self.V_tots)
+        self.N_filled = self.min_replicas
         if self.DEBUG: self.print_replicas()
         
         # making sure that our initial count is equal to the minimum number of replicas
@@ -63,49 +120,99 @@ class QMC(BaseModel):
         self.N_target = self.min_replicas # let's do this once and hold onto the initial value forever (don't update down below)
             
         # The initial value of the reference energy E_ref is the potential energy at the initial position of the replicas.
+        self.Calculate_V_tots()
         self.Calculate_E_ref()
+
+        self.engine = make_backend(self.backend, self)
+        self.backend = self.engine.name # the backend actually in use (after any fallback)
     
+    @property
+    def walker_shape(self):
+        """ Shape of one walker: (particle_count-1,) relative coordinates in 1D, (particle_count-1, dim) relative vectors otherwise. """
+        return (self.particle_count-1,) if self.dim == 1 else (self.particle_count-1, self.dim)
+
     def replica_tot_pot(self, xs_array):
         """ 
         Calculates the total potential energy of the system for a replica.
         The xs_array contains the relative distances between the particles.
         """
-        if self.particle_count < 2: raise ValueError("There should be at least 2 particles")
+        return self.replica_tot_pots(np.asarray(xs_array, dtype=float).reshape(1, *self.walker_shape))[0]
 
-        V_tot = 0.0
+    def replica_tot_pots(self, xs):
+        """ 
+        Calculates the total potential energy of every replica in one vectorized pass.
+        xs has shape (replicas, *walker_shape); returns an array with one energy per replica.
+        V is called exactly once, on the array of all distances, so it must accept NumPy arrays (V_Gauss does).
+        """
+        if self.particle_count < 2: raise ValueError("There should be at least 2 particles")
+        if self.pair_cutoff is not None: return self.cutoff_tot_pots(xs)
 
-        # LOOP1: Calculate potential for directly stored relative distances
-        for x in xs_array: V_tot += self.V(x)
+        # directly stored relative distances, followed by the 'derived relative distances' xs[i] - xs[j] for i < j
+        return self.V(pair_distances(xs)).sum(axis=1)
+    
+    def cutoff_tot_pots(self, xs):
+        """ 
+        replica_tot_pots restricted to pairs closer than pair_cutoff, vectorized over walkers.
+        Each walker's particle positions (0 followed by its relative coordinates) are sorted, so the pairs within the cutoff
+        are the neighbours at offsets 1, 2, ... in sorted order, and the scan stops at the first offset with no such pair.
+        The cost is walkers x particles x (largest number of neighbours inside the cutoff) rather than walkers x pairs.
+        """
+        positions = np.sort(np.concatenate((np.zeros((len(xs), 1)), xs), axis=1), axis=1)
+        V_tots = np.zeros(len(xs))
+        for offset in range(1, self.particle_count):
+            distances = positions[:, offset:] - positions[:, :-offset]
+            close = distances < self.pair_cutoff
+            if not close.any(): break # sorted: pairs further apart in the order are further apart in space
+            if close.mean() > 0.25: V_tots += np.where(close, self.V(distances), 0.0).sum(axis=1) # dense: cheaper than indexing
+            else: V_tots += np.bincount(np.nonzero(close)[0], weights=self.V(distances[close]), minlength=len(xs))
+        return V_tots
 
-        # LOOP2: Calculate potential for 'derived relative distances'
-        for i in range(self.particle_count-1):
-            for j in range(i+1, self.particle_count-1):
-                # Derived distances calculated using differences between distances in xs_array
-                derived_distance = xs_array[i] - xs_array[j]
-                V_tot += self.V(derived_distance)
+    def cutoff_error_bound(self, samples=1000):
+        """ 
+        Largest possible error in a walker's total potential from pair_cutoff: every pair beyond the cutoff,
+        each at the largest |V(r)| for r in [pair_cutoff, xmax - xmin] (sampled on a grid).
+        """
+        rs = np.linspace(self.pair_cutoff, max(self.xmax - self.xmin, self.pair_cutoff), samples)
+        pairs = self.particle_count * (self.particle_count - 1) // 2
+        return float(pairs * np.abs(self.V(rs)).max())
 
-        return V_tot
-    
     def CountReplicas(self):
         """ NOTE: RUN THIS AFTER CullDeadReplicas .... Counts the number of alive replicas. """
         self.N_prev = self.N    # Save the previous count
-        self.N = len(self.replicas) # simple count of the number of replicas (which are all alive)
+        self.N = self.N_filled # simple count of the number of replicas (which are all alive)
         if self.DEBUG: print(f"CountReplicas: N: {self.N}  N_prev: {self.N_prev}  N_target: {self.N_target}")
         
     def CullDeadReplicas(self):
-        """ Reap all of the dead replicas by creating a new replica array using only those that are alive. """
-        self.replicas = [replica for replica in self.replicas if replica.alive]
+        """ 
+        Reap all of the dead replicas. 
+        Branch already gathers only the survivors (and their copies) into the front of the walker array, so there is nothing left to do.
+        """
+        pass
+
+    @property
+    def replicas(self):
+        """ Debugging view of the ensemble as a list of Replica objects (built on demand, never used in the hot path). """
+        return [Replica(alive=True, xs_array=self.xs[i].ravel().tolist()) for i in range(self.N_filled)]
+
+    def Calculate_V_tots(self):
+        """ 
+        Evaluates the total potential of every alive replica and caches it in V_tots.
+        With a trial wave function the local energy E_L is cached instead, so E_ref and Branch use E_L in place of V.
+        Run this once per step right after Walk; Calculate_E_ref and Branch both read the cache.
+        """
+        xs = self.xs[:self.N]
+        V_tots = self.replica_tot_pots(xs)
+        if self.trial is not None: V_tots = self.trial.local_energy(xs, V_tots)
+        self.V_tots[:self.N] = V_tots
 
     def Calculate_V_avg(self):
         """ 
         Calulates the average potential for each replicas.
         
-        First calculate the total potential for each replica, 
-           and then find the average potential across all replicas.
+        Uses the total potential for each replica cached by Calculate_V_tots, 
+           and then finds the average potential across all replicas.
         """
-        V_tot = 0.0
-        for replica in self.replicas:
-            V_tot += self.replica_tot_pot(replica.xs_array)
+        V_tot = self.V_tots[:self.N].sum()
         V_avg = V_tot / self.N
         return V_avg    
     
@@ -135,7 +242,6 @@ class QMC(BaseModel):
             use_eqn_2_35 = True # select between 2.35 and 2.36 to compute E_ref
             if use_eqn_2_35:
                 V_avg = self.Calculate_V_avg()
-                alpha = (const.hbar / self.delta_tau)
                 self.E_ref = V_avg - self.alpha * (1 - self.N / self.N_prev) # eqn 2.35
             else:
                 self.E_ref += self.alpha * (1 - self.N / self.N_target)  # eqn 2.36
@@ -144,12 +250,30 @@ class QMC(BaseModel):
     def Walk(self):
         """ 
         This walks the relative positions between the particles for all replicas. 
+        With a trial wave function each replica also drifts by delta_tau * grad(ln Psi_T) (importance sampling).
         """
         prefactor = np.sqrt(self.delta_tau)
-        for replica in self.replicas: # iterate over all replicas
-            # add a random amount to the relative distances between particles
-            for i, x in enumerate(replica.xs_array): 
-                replica.xs_array[i] += prefactor * np.random.normal()
+        if self.trial is not None: return self.DriftWalk()
+        # add a random amount to the relative distances between particles (one batched draw for all replicas)
+        self.xs[:self.N] += prefactor * self.rng.standard_normal(size=(self.N, *self.walker_shape))
+
+    def DriftWalk(self):
+        """ 
+        Importance-sampled walk: x' = x + delta_tau * F(x) + sqrt(delta_tau) * eta, with F = grad(ln Psi_T).
+        Each move is accepted with the Metropolis probability min(1, Psi_T(x')^2 G(x'->x) / (Psi_T(x)^2 G(x->x'))),
+        which removes most of the time-step error the drift would otherwise add.
+        """
+        xs = self.xs[:self.N]
+        drift = self.delta_tau * self.trial.grad_log_psi(xs)
+        xs_new = xs + drift + np.sqrt(self.delta_tau) * self.rng.standard_normal(size=xs.shape)
+        drift_new = self.delta_tau * self.trial.grad_log_psi(xs_new)
+
+        # log of the Green's function ratio G(x'->x) / G(x->x') for the drifted Gaussian
+        square = lambda v: (v**2).reshape(len(v), -1).sum(axis=1)
+        log_G_ratio = (square(xs_new - xs - drift) - square(xs - xs_new - drift_new)) / (2 * self.delta_tau)
+        log_accept = 2 * (self.trial.log_psi(xs_new) - self.trial.log_psi(xs)) + log_G_ratio
+        accept = np.log(self.rng.random(size=self.N)) < log_accept
+        xs[accept] = xs_new[accept]
 
     def print_replicas(self):
         for ii,replica in enumerate(self.replicas):
@@ -159,54 +283,191 @@ class QMC(BaseModel):
     def Branch(self):
         """ 
         This is the Birth/Death decision branch for each replica. 
-        m_n = min[W(x), u_n]
+        m_n = min[W(x) + u_n, 3]
+
+        All multiplicities are computed at once, and every survivor is copied m_n times with a single gather
+        into the spare buffer, which is then swapped in. The population never exceeds capacity (max_replicas):
+        if it would, extra copies are dropped starting from the last replica and counted in N_overflow.
+        """
+        m_n = self.CapMultiplicities(self.BranchMultiplicities())
+        self.GatherReplicas(m_n)
+
+    def BranchMultiplicities(self, u=None):
+        """ 
+        Draws the multiplicity m_n of every alive replica from its cached potential (local energy).
+        u are the uniform draws, one per replica (drawn from rng when not given, e.g. by the parallel backend's workers).
         """
         dtau_over_hbar = self.delta_tau/hbar
+        V_tots = self.V_tots[:self.N] # cached by Calculate_V_tots for this step
+        if u is None: u = self.rng.random(size=self.N)
         
-        for i in range(self.N): # iterate over all replicas
-            replica = self.replicas[i]
-#           W = np.exp(-dtau_over_hbar * (self.replica_tot_pot(xs_array) - self.E_ref)) # eqn 2.16
-            W = 1 - ((self.replica_tot_pot(replica.xs_array) - self.E_ref) * dtau_over_hbar) # eqn 2.29
-            
-            m_n = min(int(W + np.random.uniform()), 3)
-            if m_n == 0:  # Kill the replica
-                if self.DEBUG: print(f" Killing replica {i}  W: {W}  m_n: {m_n}  E_ref: {self.E_ref:.4f}")
-                replica.alive = False
-
-            else:  # For m_n == 2 or 3, replicate the current replica
-                count_copies = m_n - 1  # Number of copies to make
-                while count_copies > 0:
-                    if self.DEBUG: print(f" Replica {i} - Duplicate {count_copies} times  W: {W}  m_n: {m_n}  E_ref: {self.E_ref:.4f}")
-                    # Create a new replica and add it to the list
-                    new_replica = Replica(alive=replica.alive, 
-                                          xs_array=replica.xs_array.copy())
-                    self.replicas.append(new_replica)
-                    count_copies -= 1
-                        
-                if count_copies > 0:
-                    raise ValueError("Not enough dead replicas to make copies")
+#       W = np.exp(-dtau_over_hbar * (V_tots - self.E_ref)) # eqn 2.16
+        W = 1 - ((V_tots - self.E_ref) * dtau_over_hbar) # eqn 2.29
+        return np.clip((W + u).astype(int), 0, 3)
+
+    def CapMultiplicities(self, m_n):
+        """ Drops copies (from the last replica backwards) so the next population fits into capacity. """
+        # every survivor keeps one slot; copies beyond that only fit into what is left of the capacity
+        extra = np.maximum(m_n - 1, 0)
+        room = self.capacity - np.count_nonzero(m_n)
+        overflow = int(extra.sum()) - room
+        self.dropped = max(overflow, 0)
+        if overflow > 0:
+            extra = np.minimum(extra, np.maximum(room - (np.cumsum(extra) - extra), 0))
+            m_n = np.minimum(m_n, 1) + extra
+            self.N_overflow += overflow
+            if self.DEBUG: print(f" Branch: capacity {self.capacity} reached, dropped {overflow} copies  E_ref: {self.E_ref:.4f}")
+        self.deaths = int(np.count_nonzero(m_n == 0))
+        self.births = int(extra.sum())
+        if self.DEBUG: print(f" Branch: killed {self.deaths}  copies {self.births}  E_ref: {self.E_ref:.4f}")
+        return m_n
+
+    def GatherReplicas(self, m_n):
+        """ Copies replica i m_n[i] times into the spare buffer (one gather) and swaps it in as the new population. """
+        parents = np.repeat(np.arange(self.N), m_n)
+        self.N_filled = len(parents)
+        np.take(self.xs, parents, axis=0, out=self.xs_spare[:self.N_filled])
+        np.take(self.V_tots, parents, out=self.V_tots_spare[:self.N_filled])
+        self.xs, self.xs_spare = self.xs_spare, self.xs
+        self.V_tots, self.V_tots_spare = self.V_tots_spare, self.V_tots
         
-    def Binning(self):
+    def centroids(self):
+        """ 
+        Centroid of each alive replica, measured from particle 0 (positions are 0 followed by the relative coordinates).
+        Shape (N,) in 1D and (N, dim) otherwise.
+        """
+        return self.xs[:self.N].sum(axis=1) / self.particle_count
+
+    def radii(self):
+        """ Distance of each alive replica's centroid from particle 0 (|centroid| in any dim). """
+        return np.abs(self.centroids()) if self.dim == 1 else np.sqrt((self.centroids()**2).sum(axis=1))
+
+    def Binning(self, radial=False):
         """ 
         Divides the range [x_min,x_max] into bin_count equally sized bins. 
         For each replica, we compute the average position of this replica. 
+        With dim > 1 the histogram is the marginal over every centroid component, or with radial=True
+        the distribution of the centroid radius over [0, x_max].
         
         This is to be done after the system has stabilized. 
         """
-        # roll through all of the replicas and calculate the centroid position of each 
-        centroid_array = []
-        for replica in self.replicas: # iterate over all replicas
-            centroid_array.append(self.centroid(replica.xs_array))
-            
-        hist_array = np.histogram(centroid_array, bins=self.bins, range=[self.xmin, self.xmax])
+        if radial:
+            centroid_array = self.radii()
+            hist_array = np.histogram(centroid_array, bins=self.bins, range=[0, self.xmax])
+        else:
+            centroid_array = self.centroids()
+            hist_array = np.histogram(centroid_array.ravel(), bins=self.bins, range=[self.xmin, self.xmax])
         return hist_array, centroid_array
     
+    def set_walkers(self, xs):
+        """
+        Restarts the population from the walkers xs (e.g. an equilibrated population from population_cache.py).
+        min_replicas rows are drawn from xs with rng (with replacement only if xs has fewer rows) and E_ref is recomputed.
+        """
+        xs = np.asarray(xs, dtype=float)
+        if xs.shape[1:] != self.walker_shape:
+            raise ValueError(f"walkers must have shape (n, {', '.join(map(str, self.walker_shape))}), got {xs.shape}")
+        rows = self.rng.choice(len(xs), size=self.min_replicas, replace=len(xs) < self.min_replicas)
+        self.xs[:self.min_replicas] = xs[rows]
+        self.N_filled = self.N = self.N_prev = self.min_replicas
+        self.E_ref = None
+        self.Calculate_V_tots()
+        self.Calculate_E_ref()
+
+    def save_checkpoint(self, path, **extra):
+        """ 
+        Writes the full simulation state to a single .npz file at path: the configuration, the alive walkers and their 
+        cached potentials, N/N_prev/N_target, E_ref and the exact state of the bit generator behind rng.
+        Any extra keyword values (e.g. the caller's accumulators) are pickled into the same file.
+        The file is written to a temporary name first and then moved into place, so a killed job never leaves half a checkpoint.
+        """
+        config = self.model_dump(include=set(CHECKPOINT_FIELDS))
+        config["trial"] = None if self.trial is None else repr(self.trial) # V_tots holds local energies of this trial
+        counts = dict(N=self.N, N_prev=self.N_prev, N_target=self.N_target, N_overflow=self.N_overflow, E_ref=self.E_ref, 
+                      step_count=self.step_count)
+
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                np.savez(f, 
+                         xs=self.xs[:self.N], 
+                         V_tots=self.V_tots[:self.N], 
+                         config=np.array(json.dumps(config)), 
+                         counts=np.array(json.dumps(counts)), 
+                         rng_state=np.frombuffer(pickle.dumps(self.rng.bit_generator.state), dtype=np.uint8), # holds ndarrays for Philox, SFC64, MT19937
+                         extra=np.frombuffer(pickle.dumps(extra), dtype=np.uint8))
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path): os.remove(tmp_path)
+            raise
+
+    @classmethod
+    def load_checkpoint(cls, path, V, **overrides):
+        """ 
+        Rebuilds a QMC from a checkpoint written by save_checkpoint; returns (qmc, extra).
+        V is not stored in the file and must be supplied again; overrides replace saved configuration fields (e.g. DEBUG).
+        The trial wave function must be supplied again too (as trial=...), and must be the one the checkpoint was written with.
+        Stepping the restored QMC continues bit-for-bit where the saved one stopped.
+        """
+        with np.load(path) as data:
+            config = json.loads(str(data["config"]))
+            saved_trial, trial = config.pop("trial", None), overrides.get("trial")
+            if saved_trial != (None if trial is None else repr(trial)):
+                raise ValueError(f"{path} was written with trial wave function {saved_trial}, got {trial!r}; resume with the same --trial")
+            counts = json.loads(str(data["counts"]))
+            qmc = cls(V=V, **{**config, **overrides})
+
+            N = counts["N"]
+            qmc.xs[:N] = data["xs"]
+            qmc.V_tots[:N] = data["V_tots"]
+            qmc.N_filled = N
+            for name, value in counts.items(): setattr(qmc, name, value)
+
+            qmc.rng.bit_generator.state = pickle.loads(data["rng_state"].tobytes())
+            extra = pickle.loads(data["extra"].tobytes())
+        return qmc, extra
+
+    @staticmethod
+    def checkpoint_config(path):
+        """ The configuration fields (CHECKPOINT_FIELDS) saved with a checkpoint, without rebuilding the QMC. """
+        with np.load(path) as data:
+            return json.loads(str(data["config"]))
+
+    @staticmethod
+    def checkpoint_extra(path):
+        """ The extra keyword values saved with a checkpoint, without rebuilding the QMC. """
+        with np.load(path) as data:
+            return pickle.loads(data["extra"].tobytes())
+
+    def add_observer(self, observer):
+        """ 
+        Registers observer to be notified during every step: observer.on_phase(qmc, name, seconds) after each phase 
+        and observer.on_step(qmc) once the step is complete (see telemetry.Profiler). Returns observer.
+        Without observers step() runs the backend directly, so the timers cost nothing.
+        """
+        self.observers.append(observer)
+        return observer
+
+    def remove_observer(self, observer):
+        self.observers.remove(observer)
+
     def step(self):
         """ Steps the simulation forward 1 delta-t step and returns <V> and N. """
-        self.Walk()
-        self.Calculate_E_ref()
-        self.Branch()
-        self.CullDeadReplicas()
-        self.CountReplicas()
+        if not self.observers:
+            self.engine.step(self) # Walk, Calculate_V_tots, Calculate_E_ref, Branch, CullDeadReplicas, CountReplicas
+        else:
+            for name, phase in self.engine.phases(self):
+                start = time.perf_counter()
+                phase()
+                seconds = time.perf_counter() - start
+                for observer in self.observers: observer.on_phase(self, name, seconds)
+        self.step_count += 1
+        for observer in self.observers: observer.on_step(self)
         if self.DEBUG: print("-"*80)
         # nothing is returned, but class variables have been updated
+
+    def close(self):
+        """ Releases anything the compute backend holds (worker processes, shared memory); the walkers stay usable. """
+        self.xs, self.xs_spare = self.xs.copy(), self.xs_spare.copy()
+        self.V_tots, self.V_tots_spare = self.V_tots.copy(), self.V_tots_spare.copy()
+        self.engine.close()
@@ -0,0 +1,113 @@
+# on-disk cache of equilibrated walker populations (used by qmc_cli.py --population-cache)
+#
+# A run that starts from an equilibrated population instead of every walker at the origin skips most of its burn-in.
+# Populations are keyed by the potential, particle_count, delta_tau, dim and trial wave function (importance-sampled walkers
+# follow a different distribution), one .npz file per key. The least recently used files are evicted once the
+# directory grows past max_bytes. Several runs may share the directory: writes go through private temporary files and
+# entries that another process evicts in the meantime are skipped.
+
+import hashlib
+import json
+import os
+import tempfile
+import numpy as np
+from tabulated import potential_key
+
+class PopulationCache:
+    """ Stores and finds equilibrated walker arrays (rows of particle_count-1 relative coordinates) under directory. """
+    def __init__(self, directory, max_bytes=256 * 2**20):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(V, particle_count, delta_tau, trial=None, dim=1):
+        """ The cache key; a tabulated potential shares its entries with the exact one. """
+        key = dict(V=potential_key(V), particle_count=particle_count, delta_tau=delta_tau,
+                   trial=None if trial is None else repr(trial))
+        if dim > 1: key["dim"] = dim
+        return json.dumps(key)
+
+    def path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode()).hexdigest()[:16] + ".npz")
+
+    def store(self, V, particle_count, delta_tau, xs, trial=None):
+        """ Saves the population xs (replacing any older one under the same key), then evicts down to max_bytes. """
+        xs = np.asarray(xs, dtype=float)
+        key = self.key(V, particle_count, delta_tau, trial, dim=xs.shape[2] if xs.ndim == 3 else 1)
+        path = self.path(key)
+        fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=self.directory) # unique, so concurrent writers of a key don't collide
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, xs=xs, key=np.array(key))
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path): os.remove(tmp_path)
+            raise
+        self.evict(keep=path)
+
+    def load(self, V, particle_count, delta_tau, trial=None, rng=None, dim=1, extend_trial=None):
+        """
+        The cached population for this key, or None.
+        Without an exact match a cached (particle_count-1)-particle population is extended by one particle
+        (see extend), which needs rng. That population is looked up under extend_trial, the trial wave function
+        the (particle_count-1)-particle run used (matched and fitted trials depend on the particle count).
+        """
+        xs = self.read(self.key(V, particle_count, delta_tau, trial, dim))
+        if xs is None and particle_count > 2 and rng is not None:
+            xs = self.read(self.key(V, particle_count - 1, delta_tau, extend_trial, dim))
+            if xs is not None: xs = self.extend(xs, rng)
+        return xs
+
+    def read(self, key):
+        path = self.path(key)
+        try:
+            with np.load(path) as data:
+                if str(data["key"]) != key: return None # hash collision
+                xs = data["xs"]
+            os.utime(path) # the modification time doubles as the last-use time for LRU eviction
+        except FileNotFoundError: # not cached, or evicted by another process
+            return None
+        return xs
+
+    @staticmethod
+    def extend(xs, rng):
+        """
+        Adds a particle to every walker: its coordinate relative to particle 0 is the walker's mean position
+        plus a Gaussian offset as wide as the spread of the existing coordinates (per component when dim > 1).
+        """
+        vectors = xs.reshape(len(xs), xs.shape[1], -1) # (walkers, particle_count-1, dim) in any dim
+        positions = np.concatenate((np.zeros((len(xs), 1, vectors.shape[2])), vectors), axis=1)
+        new = positions.mean(axis=1) + xs.std() * rng.standard_normal((len(xs), vectors.shape[2]))
+        return np.concatenate((vectors, new[:, np.newaxis]), axis=1).reshape(len(xs), xs.shape[1] + 1, *xs.shape[2:])
+
+    def entries(self):
+        """ (path, last use, bytes) of every cached population, skipping files another process removes meanwhile. """
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".npz"): continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((path, stat.st_mtime, stat.st_size))
+        return entries
+
+    def evict(self, keep=None):
+        """ Deletes the least recently used entries until the cache fits into max_bytes (keep is never deleted). """
+        entries = sorted(self.entries(), key=lambda entry: entry[1])
+        total = sum(size for path, mtime, size in entries)
+        for path, mtime, size in entries:
+            if total <= self.max_bytes: break
+            if path == keep: continue
+            total -= size
+            try:
+                os.remove(path)
+            except FileNotFoundError: # already evicted by another process
+                pass
+
+    @property
+    def size(self):
+        """ Total bytes used by the cached populations. """
+        return sum(size for path, mtime, size in self.entries())
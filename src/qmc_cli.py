@@ -2,24 +2,40 @@
 # will handle options passed in from the command line
 
 from model import QMC
-from view import plot_data, mean, plot_histogram, mean_stddev, plot_energy_vs_alpha
+from ensemble import QMCEnsemble
+from alpha_search import AlphaSearch
+from population_cache import PopulationCache
+from accumulators import RingBuffer, WindowedAccumulator, BlockingAnalyzer, DriftDetector, Welford, Histogram
+import numpy as np
 from utils.potential import V_Gauss
+from utils.system import System
+from trial_wavefunction import GaussianPairTrial
+from sweep import run_sweep, spawn_keys
+from backends import BACKENDS
+from telemetry import Profiler
+from pydantic import BaseModel
+from typing import Optional
 import argparse
+import os
 import sys
 import time
 
+# view (matplotlib) and reference (scipy.sparse) are imported only by the runs that use them, so that
+# -h and plain runs start without loading either
+
 
 # globals (yeah, I know)
 particles = 2          # number of particles to simulate
-dim = 1                # number of dimensions (D=1 for this exercise)
+dim = 1                # number of spatial dimensions (D=1 for this exercise; 2 and 3 use Euclidean pair distances)
 min_replicas = 500     # minimum number of replicas
-max_replicas = 3000    # maximum number of replicas
+max_replicas = 3000    # maximum number of replicas (the CLI raises it to 2 * min_replicas unless --max-replicas is given)
 max_steps = 100        # maximum number of time steps to run the simulation (τ0 = 1000)
 delta_t = 0.1          # time step size (Δτ = 0.1)
 xmin = -20             # minimum value of the spatial coordinate (xmin = −20)
 xmax = 20              # maximum value of the spatial coordinate (xmax = 20)
 bins = 100             # number of spatial bins for sorting the replicas (only used during 'Counting' to plot the ground state wave function)
 seed = 42              # seed value for the random number generators (for repeatability)
+bit_generator = "PCG64"  # numpy bit generator behind each simulation's Generator
 mass = 1               # mass of the particle (m = 1)
 E_ref = 0              # reference energy (E_ref = 0)
 
@@ -32,62 +48,353 @@ search_alpha = False
 early_breakout = False
 potential = None
 samp_pct = 0.1
+history = 100000       # number of recent E_ref / N values kept for plotting
+target_error = None    # stop once the standard error of E_0 reaches this (adaptive mode; None = run max_steps)
+min_samples = 256      # smallest number of post-equilibration samples trusted for the adaptive stopping rule
+checkpoint = "qmc_checkpoint.npz" # file written by --checkpoint-every
+checkpoint_every = 0   # save a checkpoint every this many steps (0 = never)
+resume = None          # checkpoint file to resume from
+density_out = None     # file to write the accumulated ground-state density to
+check = False          # compare E_0 with the grid reference solution of the Hamiltonian QMC samples (reference.py; n = 2 or 3 in 1D)
+radial = False         # histogram the distance of each centroid from particle 0 instead of its components (for dim > 1)
+hist_coords = False    # also histogram every relative coordinate (not just the replica centroids)
+trial = None           # importance sampling: None (plain DMC), 'matched', or the exponent a of a Gaussian pair trial
+workers = 1
+backend = "numpy"
+shard_workers = 1      # worker processes sharing one population (parallel backend)
+tabulate_V = False
+alpha_search = False   # find alpha with the coarse grid + golden-section search instead of the --gda scan
+alpha_target = None    # --alpha-search: the E_0 to match (None = minimize the population fluctuation instead)
+pair_cutoff = None     # only pairs closer than this contribute to V (None = all pairs)
+population_cache = None # directory of equilibrated populations that runs start from and save to (None = start at the origin)
+cache_mb = 256         # size limit of the population cache in MB (least recently used populations are evicted)
+ensemble_size = 64     # alphas stepped together in one QMCEnsemble by --gda (each ensemble is one sweep task)
+profile = None         # file the per-phase profile is written to (.csv: one row per step, otherwise a JSON summary)
+plot_out = None        # directory the plots are written to instead of being shown (implies --plot)
+plot_format = "png"    # file format of the plots written to plot_out (png or svg)
+
+class RunConfig(BaseModel):
+    """ Everything run_simulation needs for one run (picklable, so sweeps can ship it to worker processes). """
+    particles: int = particles
+    dim: int = dim
+    min_replicas: int = min_replicas
+    max_replicas: int = max_replicas
+    max_steps: int = max_steps
+    bins: int = bins
+    seed: int = seed
+    spawn_key: tuple = ()
+    bit_generator: str = bit_generator
+    alpha: float = global_alpha
+    plot: bool = plot
+    DEBUG: bool = DEBUG
+    early_breakout: bool = early_breakout
+    samp_pct: float = samp_pct
+    history: int = history
+    target_error: Optional[float] = target_error
+    min_samples: int = min_samples
+    backend: str = backend
+    shard_workers: int = shard_workers
+    tabulate_V: bool = tabulate_V
+    checkpoint: str = checkpoint
+    checkpoint_every: int = checkpoint_every
+    resume: Optional[str] = resume
+    density_out: Optional[str] = density_out
+    hist_coords: bool = hist_coords
+    radial: bool = radial
+    check: bool = check
+    trial: Optional[str] = trial
+    profile: Optional[str] = profile
+    pair_cutoff: Optional[float] = pair_cutoff
+    population_cache: Optional[str] = population_cache
+    cache_mb: float = cache_mb
+    plot_out: Optional[str] = plot_out
+    plot_format: str = plot_format
+
+def load_view(config):
+    """ 
+    Imports view (and with it matplotlib) on first use; with plot_out set, the non-interactive Agg backend is 
+    selected first, so no display is needed and no GUI toolkit is loaded.
+    """
+    if config.plot_out is not None:
+        import matplotlib
+        matplotlib.use("Agg")
+        os.makedirs(config.plot_out, exist_ok=True)
+    import view
+    return view
+
+def plot_path(config, name):
+    """ The file a plot called name is written to, or None (show it) without plot_out. """
+    if config.plot_out is None: return None
+    return os.path.join(config.plot_out, f"{name}.{config.plot_format}")
+
+def density_histograms(config, qmc):
+    """ 
+    Histograms for the ground-state density, accumulated over every step used for E_0: the replica centroids 
+    (and every relative coordinate with hist_coords). Each is None when nothing will plot or save it.
+    """
+    psi = Histogram(config.bins, 0 if config.radial else qmc.xmin, qmc.xmax) if config.plot or config.density_out else None
+    psi_coords = Histogram(config.bins, qmc.xmin, qmc.xmax) if psi is not None and config.hist_coords else None
+    return psi, psi_coords
 
-def run_simulation(alpha=global_alpha):
+def run_settings(config):
+    """ The settings that lay out a run's E_0 window and stopping rule; a resumed run must use the checkpointed ones. """
+    return dict(max_steps=config.max_steps, samp_pct=config.samp_pct, target_error=config.target_error, min_samples=config.min_samples)
+
+def make_trial(config, V, particles):
+    """ The trial wave function config.trial selects for a run of particles particles (None for plain DMC). """
+    if config.trial is None: return None
+    if config.trial == "matched": return GaussianPairTrial.matched(V, particles, dim=config.dim)
+    if config.trial == "fit": 
+        import reference
+        return GaussianPairTrial.fitted(reference.solve(V, particles, hamiltonian="model")) # the ground state QMC samples
+    return GaussianPairTrial(float(config.trial))
+
+def run_simulation(config):
     V_0 = -4.0
     R = 2.0
     V = V_Gauss(sys, V_0, R)
+    alpha = config.alpha
+    DEBUG = config.DEBUG
+    samp_pct = config.samp_pct
+    trial = make_trial(config, V, config.particles)
 
-    # print(f"V_Gauss: {V(1.0)}")
-    qmc = QMC(V=V, 
-              min_replicas=min_replicas, 
-              max_replicas=max_replicas, 
-              DEBUG=DEBUG,
-              particle_count=particles, 
-              bins=bins, 
-              seed=seed, 
-              alpha=alpha) 
-
-    E_refs = []
-    N_vals = []
-    eyes = range(max_steps)
+    # E_0 is estimated from the last samp_pct of the steps; only a bounded recent history is kept for plotting.
+    # In adaptive mode (target_error set) E_0 is instead accumulated from the detected end of equilibration 
+    # until its error reaches target_error, with max_steps as a hard ceiling.
+    adaptive = config.target_error is not None
+    cache = PopulationCache(config.population_cache, int(config.cache_mb * 2**20)) if config.population_cache is not None else None
+
+    if config.resume is not None:
+        # the walkers, RNG state and accumulators all come from the checkpoint, so the run continues bit-for-bit
+        qmc, run_state = QMC.load_checkpoint(config.resume, V, DEBUG=DEBUG, trial=trial, workers=config.shard_workers)
+        if run_state.get("run_settings") != run_settings(config):
+            # the E_0 window, the adaptive equilibration ceiling and the stopping rule were laid out for the saved run
+            qmc.close()
+            raise ValueError(f"{config.resume} was written by a run with {run_state.get('run_settings')}, "
+                             f"resume it with the same -s, -x and --target-error (got {run_settings(config)})")
+        first_step, window_start, E_window, E_blocking, E_stats, E_drift, E_refs, N_vals, psi, psi_coords = run_state["run_state"]
+        alpha = qmc.alpha
+        print(f" RESUMED @ step: {first_step}  from: {config.resume}")
+        # a checkpoint of a run that neither plotted nor saved the density has no histograms: start them now
+        new_psi, new_psi_coords = density_histograms(config, qmc)
+        missing = (psi is None and new_psi is not None) or (psi_coords is None and new_psi_coords is not None)
+        if psi is None: psi = new_psi
+        if psi_coords is None and psi is not None: psi_coords = new_psi_coords
+        if missing and window_start is not None and first_step > window_start:
+            print(f" the checkpoint holds no density histogram: the density is accumulated from step {first_step} on")
+    else:
+        # print(f"V_Gauss: {V(1.0)}")
+        qmc = QMC(V=V, 
+                  min_replicas=config.min_replicas, 
+                  max_replicas=config.max_replicas, 
+                  DEBUG=DEBUG,
+                  particle_count=config.particles, 
+                  dim=config.dim, 
+                  bins=config.bins, 
+                  seed=config.seed, 
+                  spawn_key=config.spawn_key, 
+                  bit_generator=config.bit_generator, 
+                  alpha=alpha, 
+                  backend=config.backend, 
+                  tabulate_V=config.tabulate_V, 
+                  trial=trial, 
+                  pair_cutoff=config.pair_cutoff, 
+                  workers=config.shard_workers) 
+        if qmc.pair_cutoff is not None: print(f" pair cutoff {qmc.pair_cutoff}: potential error bound per walker {qmc.pair_cutoff_error:.2e}")
+        if cache is not None:
+            # start from an equilibrated population of the same system (or of the system with one particle less)
+            # the n-1 particle run sampled with its own trial (matched and fitted ones depend on the particle count)
+            extend_trial = make_trial(config, V, qmc.particle_count - 1) if qmc.particle_count > 2 else None
+            walkers = cache.load(V, qmc.particle_count, qmc.delta_tau, trial, rng=qmc.rng, dim=qmc.dim, extend_trial=extend_trial)
+            if walkers is not None:
+                qmc.set_walkers(walkers)
+                print(f" WARM START from {len(walkers)} cached walkers")
+
+        first_step = 0
+        window_start = None if adaptive else int(config.max_steps * (1 - samp_pct))
+        E_window = WindowedAccumulator(config.max_steps - int(config.max_steps * (1 - samp_pct)))
+        E_blocking = BlockingAnalyzer() # autocorrelation-aware error bar for the E_0 samples
+        E_stats = Welford()
+        E_drift = DriftDetector()
+        E_refs = RingBuffer(min(config.history, config.max_steps))
+        N_vals = RingBuffer(min(config.history, config.max_steps), dtype=int)
+        psi, psi_coords = density_histograms(config, qmc)
+    profiler = qmc.add_observer(Profiler()) if config.profile is not None else None
+    eyes = range(first_step, config.max_steps)
     epsilon = 0.0000001
-    for i in eyes:
-        qmc.step() # run the simulation forward one step
-        Nratio = 1-qmc.N/qmc.N_target
-        if DEBUG: print(f"step: {i}  E_ref: {qmc.E_ref:.6f}  N: {qmc.N}  Nratio: {Nratio:.5f}")
-        E_refs.append(qmc.E_ref)
-        N_vals.append(qmc.N)
-        _, stddev, range_start = mean_stddev(E_refs, samp_pct)
-
-        if early_breakout and i > 300 and abs(Nratio) < epsilon: 
-            print(f" CONDITION MET @ step: {i}  E_ref: {qmc.E_ref:.6f}  N: {qmc.N}  Nratio: {Nratio:.5f}")
-            break
-
-    E_0_mean, E_0_stddev, _ = mean_stddev(E_refs, samp_pct)
-    print(f"n={qmc.particle_count} E_0: {E_0_mean:.4f} +/- {E_0_stddev:.4f}  N:{qmc.N} ")
-    if plot: 
-        # hist, centroids = qmc.Binning()
-        centroids = None
-        plot_data(E_refs, N_vals, centroids, bins, title = f"QMC: n={qmc.particle_count}  N (final)={qmc.N}  alpha={alpha}",samp_pct=samp_pct)
+    try:
+        for i in eyes:
+            qmc.step() # run the simulation forward one step
+            Nratio = 1-qmc.N/qmc.N_target
+            if DEBUG: print(f"step: {i}  E_ref: {qmc.E_ref:.6f}  N: {qmc.N}  Nratio: {Nratio:.5f}")
+            E_window.push(qmc.E_ref)
+            E_refs.push(qmc.E_ref)
+            N_vals.push(qmc.N)
+
+            if window_start is None: # adaptive mode, phase 1: wait for E_ref to stop drifting
+                E_drift.push(qmc.E_ref)
+                if E_drift.equilibrated or i + 1 >= config.max_steps // 2:
+                    window_start = i + 1
+                    if DEBUG: print(f" equilibrated @ step: {i}  (drift test passed: {E_drift.equilibrated})")
+            elif i >= window_start: # phase 2: accumulate E_0
+                E_blocking.push(qmc.E_ref)
+                E_stats.push(qmc.E_ref)
+                if psi is not None: psi.push(qmc.radii() if config.radial else qmc.centroids()) # every component when dim > 1 (marginal)
+                if psi_coords is not None: psi_coords.push(qmc.xs[:qmc.N])
+                if adaptive and E_blocking.n >= config.min_samples and E_blocking.error <= config.target_error: # phase 3: done
+                    print(f" TARGET ERROR MET @ step: {i}  (equilibrated @ step: {window_start})")
+                    break
+
+            if config.early_breakout and i > 300 and abs(Nratio) < epsilon: 
+                print(f" CONDITION MET @ step: {i}  E_ref: {qmc.E_ref:.6f}  N: {qmc.N}  Nratio: {Nratio:.5f}")
+                break
+
+            if config.checkpoint_every > 0 and (i + 1) % config.checkpoint_every == 0:
+                qmc.save_checkpoint(config.checkpoint, run_state=(i + 1, window_start, E_window, E_blocking, E_stats, E_drift, E_refs, N_vals, psi, psi_coords), 
+                                    run_settings=run_settings(config))
+    finally:
+        qmc.close() # stops the parallel backend's workers and frees its shared memory, also when the run fails
+    if cache is not None: cache.store(V, qmc.particle_count, qmc.delta_tau, qmc.xs[:qmc.N], trial)
+    if adaptive:
+        E_0_mean, E_0_stddev = E_blocking.mean, E_stats.stddev
+    else:
+        E_0_mean, E_0_stddev = E_window.mean, E_window.stddev
+    E_0_error = E_blocking.error # nan while the blocking analysis has not converged
+    if E_blocking.converged:
+        print(f"n={qmc.particle_count} E_0: {E_0_mean:.4f} +/- {E_0_error:.4f}  (stddev: {E_0_stddev:.4f}  tau_int: {E_blocking.tau_int:.1f})  N:{qmc.N} ")
+    else:
+        print(f"n={qmc.particle_count} E_0: {E_0_mean:.4f} +/- ?  (stddev: {E_0_stddev:.4f})  N:{qmc.N} ")
+        print(f"  error not converged: the blocking analysis found no plateau in {E_blocking.n} samples"
+              + (f" (error >= {E_blocking.error_lower_bound:.4f})" if E_blocking.errors() else "") + "; run more steps (-s) or raise -x")
+    if config.check:
+        import reference
+        solution = reference.solve(V, qmc.particle_count, System(mass=qmc.mass), hamiltonian="model")
+        if not E_blocking.converged:
+            print(f"  reference E_0: {solution.E_0:.4f}  difference: {E_0_mean - solution.E_0:+.4f}  (not checked: the error of E_0 has not converged)")
+        else:
+            passed, deviation, allowed = reference.check(E_0_mean, E_0_error, solution)
+            print(f"  reference E_0: {solution.E_0:.4f}  deviation: {deviation:+.4f}  (allowed {allowed:.4f} with the time-step bias: {'ok' if passed else 'CHECK FAILED'})")
+        physical = reference.solve(V, qmc.particle_count, System(mass=qmc.mass), hamiltonian="physical")
+        print(f"  physical E_0: {physical.E_0:.4f}  offset: {E_0_mean - physical.E_0:+.4f}  (not checked: QMC samples the model kinetic term, see reference.py)")
+    if qmc.N_overflow > 0: print(f"  population cap of {qmc.capacity} reached: {qmc.N_overflow} copies were dropped while branching")
+    if profiler is not None:
+        print(profiler)
+        profiler.write(config.profile)
+    if config.density_out is not None:
+        columns = [*psi.density()] + ([psi_coords.density()[1]] if psi_coords is not None else [])
+        np.savetxt(config.density_out, np.column_stack(columns), 
+                   header="x  centroid_density" + ("  coordinate_density" if psi_coords is not None else ""))
+    if config.plot: 
+        name = "_".join(map(str, (f"qmc_n{qmc.particle_count}_seed{config.seed}", *config.spawn_key)))
+        load_view(config).plot_data(E_refs.values(), N_vals.values(), psi.density(), config.bins, title = f"QMC: n={qmc.particle_count}  N (final)={qmc.N}  alpha={alpha}",samp_pct=samp_pct, 
+                  E_0=(E_0_mean, E_0_stddev), first_step=E_refs.start, range_start=window_start if adaptive else E_window.recent.start, 
+                  out=plot_path(config, name))
         
-    return E_0_mean, E_0_stddev, qmc.N
+    return E_0_mean, E_0_error, qmc.N
+
+def run_alpha_scan(task):
+    """ 
+    Runs one chunk of an alpha scan as a single QMCEnsemble; returns the E_0 of each alpha 
+    (the mean E_ref over the last samp_pct of the steps, as in run_simulation).
+    """
+    config, alphas, keys = task
+    V = V_Gauss(sys, -4.0, 2.0)
+    ensemble = QMCEnsemble(V, [dict(alpha=alpha, seed=config.seed, spawn_key=key) for alpha, key in zip(alphas, keys)], 
+                           particle_count=config.particles, 
+                           min_replicas=config.min_replicas, 
+                           max_replicas=config.max_replicas, 
+                           bit_generator=config.bit_generator, 
+                           dim=config.dim)
+    window_start = int(config.max_steps * (1 - config.samp_pct))
+    E_sums = np.zeros(len(alphas))
+    for i in range(config.max_steps):
+        ensemble.step()
+        if i >= window_start: E_sums += ensemble.E_ref
+    return list(E_sums / (config.max_steps - window_start))
+
+def ensemble_ignored_options(config):
+    """ The options set in config that the vectorized --gda scan (run_alpha_scan) does not implement. """
+    ignored = dict(target_error=config.target_error is not None, 
+                   pair_cutoff=config.pair_cutoff is not None, 
+                   tabulate=config.tabulate_V, 
+                   backend=config.backend != "numpy", 
+                   population_cache=config.population_cache is not None, 
+                   profile=config.profile is not None)
+    return [f"--{option.replace('_', '-')}" for option, is_set in ignored.items() if is_set]
 
-def find_alpha():
+def find_alpha(config, workers=1):
     alpha_lo = 0.1
     alpha_hi = 1.0
     steps = 1000
     alpha_del = (alpha_hi - alpha_lo)/steps
-    alpha_xs = []
-    energy_ys = []
+    alpha_xs = [alpha_lo + i * alpha_del for i in range(steps)]
     print(f"alpha_lo: {alpha_lo}  alpha_hi: {alpha_hi}  alpha_del: {alpha_del}  steps: {steps}")
-    for i in range(steps):
-        global_alpha = alpha_lo + i * alpha_del
-        E_0_mean, E_0_stddev, Nval = run_simulation(alpha=global_alpha)
-        alpha_xs.append(global_alpha)
-        energy_ys.append(E_0_mean)
+    keys = spawn_keys(steps)
+    ignored = ensemble_ignored_options(config)
+    if ignored: print(f"{', '.join(ignored)} not supported by the ensemble scan: running each alpha with run_simulation")
+    if config.trial is None and not config.early_breakout and not ignored:
+        # plain DMC: the alphas run in ensembles of ensemble_size, each a single vectorized simulation
+        chunks = range(0, steps, ensemble_size)
+        tasks = [(config, alpha_xs[lo:lo + ensemble_size], keys[lo:lo + ensemble_size]) for lo in chunks]
+        energy_ys = [E_0 for E_0s in run_sweep(run_alpha_scan, tasks, workers=workers) for E_0 in E_0s]
+    else:
+        configs = [config.model_copy(update=dict(alpha=alpha, spawn_key=key)) for alpha, key in zip(alpha_xs, keys)]
+        results = run_sweep(run_simulation, configs, workers=workers)
+        energy_ys = [E_0_mean for E_0_mean, E_0_error, Nval in results]
         
-    plot_energy_vs_alpha(alpha_xs, energy_ys, title="Energy vs Alpha")
+    load_view(config).plot_energy_vs_alpha(alpha_xs, energy_ys, title="Energy vs Alpha", out=plot_path(config, "energy_vs_alpha"))
+
+def search_alpha_optimized(config, target=None):
+    """ 
+    Finds alpha with AlphaSearch: a coarse grid, then golden-section refinement around its best point.
+    The score is |E_0 - target| when target is given, otherwise the relative fluctuation of the population (std(N)/N_target).
+    One plain run at config.alpha equilibrates the walkers; every candidate starts from that population with the same 
+    random stream (common random numbers), so it only needs a short burn-in before its E_0 window.
+    Options the ensembles do not implement (see ensemble_ignored_options) are rejected with a ValueError.
+    """
+    ignored = ensemble_ignored_options(config)
+    if ignored: raise ValueError(f"--alpha-search runs plain DMC ensembles and cannot be combined with {', '.join(ignored)}")
+    V = V_Gauss(sys, -4.0, 2.0)
+    window = max(config.max_steps - int(config.max_steps * (1 - config.samp_pct)), 1)
+    burn_in = max(window // 4, 10)
+    shape = dict(particle_count=config.particles, min_replicas=config.min_replicas, max_replicas=config.max_replicas, 
+                 bit_generator=config.bit_generator, dim=config.dim)
+
+    warm = QMCEnsemble(V, [dict(alpha=config.alpha, seed=config.seed, spawn_key=config.spawn_key)], **shape)
+    for i in range(config.max_steps): warm.step()
+    walkers = warm.xs[0, :warm.N[0]].copy()
+
+    def run(alphas):
+        """ Simulates the candidate alphas as one ensemble; returns (E_0, std(N)/N_target) for each. """
+        ensemble = QMCEnsemble(V, [dict(alpha=alpha, seed=config.seed, spawn_key=(*config.spawn_key, 1)) for alpha in alphas], 
+                               walkers=walkers, **shape)
+        E_refs, N_vals = [], []
+        for i in range(burn_in + window):
+            ensemble.step()
+            if i >= burn_in:
+                E_refs.append(ensemble.E_ref)
+                N_vals.append(ensemble.N)
+        return list(zip(np.mean(E_refs, axis=0), np.std(N_vals, axis=0) / ensemble.N_target))
+
+    score = (lambda result: abs(result[0] - target)) if target is not None else (lambda result: result[1])
+    search = AlphaSearch(run, score)
+    alpha = search.search()
+    E_0, N_fluctuation = search.results[alpha]
+    cost = search.evaluations * (burn_in + window) + config.max_steps
+    print(f"alpha: {alpha:.4f}  E_0: {E_0:.4f}  N fluctuation: {N_fluctuation:.4f}  "
+          f"({search.evaluations} candidates, {cost} steps vs {1000 * config.max_steps} for the --gda scan)")
+    if config.plot:
+        alpha_xs = sorted(search.results)
+        load_view(config).plot_energy_vs_alpha(alpha_xs, [search.results[alpha][0] for alpha in alpha_xs], title="Energy vs Alpha (search)", 
+                                               out=plot_path(config, "energy_vs_alpha_search"))
+    return alpha, E_0
+
+def loop_particles(config, loop, workers=1):
+    """ Runs n=2..loop particles, each with its own child stream of config.seed. """
+    counts = range(2, loop+1)
+    keys = spawn_keys(len(counts))
+    configs = [config.model_copy(update=dict(particles=n, spawn_key=key)) for n, key in zip(counts, keys)]
+    return run_sweep(run_simulation, configs, workers=workers)
 
 
 parser = argparse.ArgumentParser(
@@ -104,22 +411,57 @@ Example usage:
                     # epilog='----'
                     )
 parser.add_argument('-n', '--particles',  help=f'the number of particles to simulate (default: {particles})')
+parser.add_argument('--dim', help=f'number of spatial dimensions; pair potentials act on Euclidean distances (default: {dim})')
 parser.add_argument('-m', '--min_replicas', help=f'the minimum number of replicas to use during the simulation (default: {min_replicas})')
+parser.add_argument('--max-replicas', help=f'cap on the population; copies beyond it are dropped while branching, so it must exceed -m (default: max({max_replicas}, 2 * MIN_REPLICAS))')
 parser.add_argument('-s', '--steps',  help=f'the number of timesteps to use during the simulation (default: {max_steps})')
 
 parser.add_argument('-r', '--random', help=f'set the random seed value (default: {seed})')
 parser.add_argument('-t', '--trandom', action='store_true', help='set the random seed based on the current timestamp (default: varies)')
 
+parser.add_argument('--bit-generator', choices=["PCG64", "PCG64DXSM", "Philox", "SFC64", "MT19937"], help=f'numpy bit generator used for the random streams (default: {bit_generator})')
+
 parser.add_argument('-b', '--bins', help=f'the number of spatial “boxes” (nb) for sorting the replicas during their sampling (default: {bins})')
 parser.add_argument('-p', '--plot', action='store_true', help=f'plot the data (default: {plot})')
+parser.add_argument('--plot-out', help='write the plots to files in this directory instead of showing them; needs no display (default: None)')
+parser.add_argument('--plot-format', choices=["png", "svg"], help=f'file format of the --plot-out plots (default: {plot_format})')
 parser.add_argument('-d', '--debug', action='store_true', help=f'print out a bunch of stuff each time through the loop (default: {DEBUG})')
 parser.add_argument('-a', '--alpha', help=f'modify the rate at which N/N_0 impacts potential calculation (default: {global_alpha})')
 
 parser.add_argument('-l', '--loop', help=f'loop through the algorihm for n=2-LOOP (default: {loop})')
 
 parser.add_argument('-g', '--gda', action='store_true', help=f'run the simulation across a range of alphas, to see if any gets us close to E_0 = -3.10634 +/- 0.0730 (default: {search_alpha})')
+parser.add_argument('--alpha-search', action='store_true', help=f'find alpha with a coarse grid refined by golden-section search (about 2%% of the simulations of --gda); plain DMC only (default: {alpha_search})')
+parser.add_argument('--alpha-target', help='E_0 that --alpha-search should match (default: None, minimize the fluctuation of N instead)')
 parser.add_argument('-e', '--early', action='store_true', help=f'allows for early termination based on N/N ratio(default: {early_breakout})')
 
+parser.add_argument('-w', '--workers', help=f'number of worker processes for the --loop and --gda sweeps (default: {workers})')
+
+parser.add_argument('-k', '--backend', choices=BACKENDS, help=f'compute backend for each step; jit needs numba and falls back to numpy without it, parallel uses --shard-workers processes (default: {backend})')
+
+parser.add_argument('--shard-workers', help=f'worker processes sharing one walker population with -k parallel (default: {shard_workers})')
+parser.add_argument('--tabulate', action='store_true', help=f'evaluate V(x) from an interpolation table instead of calling it directly (default: {tabulate_V})')
+
+parser.add_argument('--target-error', help=f'run adaptively: detect equilibration, then stop once the error of E_0 reaches this value, never running past --steps (default: {target_error})')
+
+parser.add_argument('--checkpoint', help=f'file that --checkpoint-every writes to (default: {checkpoint})')
+parser.add_argument('--checkpoint-every', help=f'save the full simulation state every this many steps (default: {checkpoint_every}, never)')
+parser.add_argument('--resume', help='resume a single run from a checkpoint file; -s and -x default to (and must match) those of the checkpointed run (default: None)')
+
+parser.add_argument('--density-out', help='write the ground-state density accumulated over the E_0 steps to this text file (default: None)')
+parser.add_argument('--radial', action='store_true', help=f'histogram the distance of each replica centroid from particle 0 instead of its components (default: {radial})')
+parser.add_argument('--hist-coords', action='store_true', help=f'also accumulate a histogram of every relative coordinate (default: {hist_coords})')
+
+parser.add_argument('--trial', nargs='?', const='matched', help="importance sampling with a Gaussian pair trial wave function; give its exponent a, 'fit' to fit it to the grid reference solution (n = 2, 3), or no value to fit a to the potential (default: None)")
+parser.add_argument('--check', action='store_true', help=f'compare E_0 with the deterministic grid solution (n = 2 or 3, --dim 1) of the Hamiltonian QMC samples, allowing for the time-step bias; the offset from the physical E_0 of test/test1.py is printed too (default: {check})')
+
+parser.add_argument('--pair-cutoff', help='only evaluate pairs of particles closer than this distance; the error bound from the tail of V is printed (default: None, every pair)')
+
+parser.add_argument('--population-cache', help='directory of equilibrated walker populations: runs start from a cached population of the same system (or extend the n-1 particle one) and save their final walkers (default: None)')
+parser.add_argument('--cache-mb', help=f'size limit of --population-cache in MB, least recently used populations are evicted first (default: {cache_mb})')
+
+parser.add_argument('--profile', help='time every phase of each step and write the profile to this file (.csv: one row per step, otherwise a JSON summary) (default: None)')
+
 parser.add_argument('-x', '--samp_pct', help=f'sample percentage for mean_stddev(default: {samp_pct})')
 
 if __name__ == "__main__":
@@ -134,13 +476,33 @@ if __name__ == "__main__":
         # print (f"args.steps: {args.steps}")
         max_steps = int(args.steps)
         
+    if args.dim is not None:
+        dim = int(args.dim)
+
     if args.min_replicas is not None:
         # print (f"args.min_replicas: {args.min_replicas}")
         min_replicas = int(args.min_replicas)
+
+    if args.max_replicas is not None:
+        max_replicas = int(args.max_replicas)
+    else:
+        max_replicas = max(max_replicas, 2 * min_replicas) # room for the population to fluctuate above its target
+    if max_replicas <= min_replicas:
+        parser.error(f"--max-replicas {max_replicas} leaves the population no room above -m {min_replicas}")
     
+    if args.bins is not None:
+        bins = int(args.bins)
+
     if args.plot is not None:
         # print (f"args.plot: {args.plot}")
         plot = bool(args.plot)
+
+    if args.plot_out is not None:
+        plot_out = args.plot_out
+        plot = True
+
+    if args.plot_format is not None:
+        plot_format = args.plot_format
         
     if args.debug is not None:
         # print (f"args.debug: {args.debug}")
@@ -154,6 +516,9 @@ if __name__ == "__main__":
         seed = int(time.time())
         # print (f"trandom seed: {seed}")
 
+    if args.bit_generator is not None:
+        bit_generator = args.bit_generator
+
     if args.alpha is not None:
         # print (f"args.alpha: {args.alpha}")
         global_alpha = float(args.alpha)
@@ -166,6 +531,12 @@ if __name__ == "__main__":
         search_alpha = bool(args.gda)
         # print (f"args.gda: {args.gda}")
         
+    if args.alpha_search:
+        alpha_search = True
+
+    if args.alpha_target is not None:
+        alpha_target = float(args.alpha_target)
+
     if args.early:
         early_breakout = bool(args.early)
         # print (f"args.early: {args.early}")
@@ -174,13 +545,140 @@ if __name__ == "__main__":
         # print (f"args.alpha: {args.alpha}")
         samp_pct = float(args.samp_pct)
 
+    if args.workers is not None:
+        workers = int(args.workers)
+
+    if args.backend is not None:
+        backend = args.backend
+
+    if args.target_error is not None:
+        target_error = float(args.target_error)
+
+    if args.checkpoint is not None:
+        checkpoint = args.checkpoint
+
+    if args.checkpoint_every is not None:
+        checkpoint_every = int(args.checkpoint_every)
+
+    if args.resume is not None:
+        resume = args.resume
+
+    if (checkpoint_every > 0 or resume is not None) and (loop is not None or search_alpha or alpha_search):
+        parser.error("--checkpoint-every and --resume only apply to single runs, not --loop or --gda sweeps")
+
+    if args.density_out is not None:
+        density_out = args.density_out
+
+    if args.hist_coords:
+        hist_coords = True
+
+    if args.radial:
+        radial = True
+
+    if args.check:
+        check = True
+
+    if args.trial is not None:
+        trial = args.trial
+
+    if args.shard_workers is not None:
+        shard_workers = int(args.shard_workers)
+
+    if args.tabulate:
+        tabulate_V = True
+
+    if args.profile is not None:
+        profile = args.profile
+
+    if args.pair_cutoff is not None:
+        pair_cutoff = float(args.pair_cutoff)
+
+    if args.population_cache is not None:
+        population_cache = args.population_cache
+
+    if args.cache_mb is not None:
+        cache_mb = float(args.cache_mb)
+
+    if resume is not None:
+        # the E_0 window and stopping rule were laid out for the checkpointed run, so a resumed run keeps -s, -x and --target-error
+        saved = QMC.checkpoint_extra(resume).get("run_settings")
+        if saved is None:
+            parser.error(f"{resume} has no run settings recorded; it was not written by --checkpoint-every")
+        if args.steps is None: max_steps = saved["max_steps"]
+        if args.samp_pct is None: samp_pct = saved["samp_pct"]
+        if args.target_error is None: target_error = saved["target_error"]
+        min_samples = saved["min_samples"]
+        if (max_steps, samp_pct, target_error) != (saved["max_steps"], saved["samp_pct"], saved["target_error"]):
+            parser.error(f"{resume} was written by a run with -s {saved['max_steps']} -x {saved['samp_pct']} --target-error {saved['target_error']}; "
+                         "resume it with the same values")
+
+        # the system comes from the checkpoint: options given on the command line are overridden by the saved ones
+        system = QMC.checkpoint_config(resume)
+        given = [("-n", args.particles is not None, particles, "particle_count"), 
+                 ("--dim", args.dim is not None, dim, "dim"), 
+                 ("-m", args.min_replicas is not None, min_replicas, "min_replicas"), 
+                 ("--max-replicas", args.max_replicas is not None, max_replicas, "max_replicas"), 
+                 ("-r/-t", args.random is not None or args.trandom, seed, "seed"), 
+                 ("--bit-generator", args.bit_generator is not None, bit_generator, "bit_generator"), 
+                 ("-a", args.alpha is not None, global_alpha, "alpha"), 
+                 ("-k", args.backend is not None, backend, "backend"), 
+                 ("--tabulate", args.tabulate, tabulate_V, "tabulate_V"), 
+                 ("--pair-cutoff", args.pair_cutoff is not None, None if args.pair_cutoff is None else float(args.pair_cutoff), "pair_cutoff")]
+        for option, is_given, value, field in given:
+            if is_given and value != system[field]:
+                print(f"warning: {option} {value} is ignored, {resume} continues the run with {field}={system[field]}")
+        particles, dim, min_replicas, max_replicas = system["particle_count"], system["dim"], system["min_replicas"], system["max_replicas"]
+        seed, bit_generator, global_alpha, backend = system["seed"], system["bit_generator"], system["alpha"], system["backend"]
+        tabulate_V, pair_cutoff = system["tabulate_V"], system["pair_cutoff"]
+
+    if (check or trial == "fit") and (particles not in (2, 3) or dim != 1 or loop is not None):
+        parser.error("--check and --trial fit need the grid reference solution, which is only available for -n 2 or 3 with --dim 1")
+
+    if alpha_search and trial is not None:
+        parser.error("--alpha-search runs plain DMC ensembles and cannot be combined with --trial")
+
+    config = RunConfig(particles=particles, 
+                       dim=dim, 
+                       min_replicas=min_replicas, 
+                       max_replicas=max_replicas, 
+                       max_steps=max_steps, 
+                       bins=bins, 
+                       seed=seed, 
+                       bit_generator=bit_generator, 
+                       alpha=global_alpha, 
+                       plot=plot, 
+                       DEBUG=DEBUG, 
+                       early_breakout=early_breakout, 
+                       samp_pct=samp_pct, 
+                       backend=backend, 
+                       shard_workers=shard_workers, 
+                       tabulate_V=tabulate_V, 
+                       target_error=target_error, 
+                       checkpoint=checkpoint, 
+                       checkpoint_every=checkpoint_every, 
+                       resume=resume, 
+                       density_out=density_out, 
+                       hist_coords=hist_coords, 
+                       radial=radial, 
+                       check=check, 
+                       trial=trial, 
+                       profile=profile, 
+                       pair_cutoff=pair_cutoff, 
+                       population_cache=population_cache, 
+                       cache_mb=cache_mb, 
+                       plot_out=plot_out, 
+                       plot_format=plot_format)
+
+    if alpha_search and ensemble_ignored_options(config):
+        parser.error(f"--alpha-search runs plain DMC ensembles and cannot be combined with {', '.join(ensemble_ignored_options(config))}")
+
     if loop is not None: 
-        for i in range(2, loop+1):
-            particles = i
-            run_simulation(alpha=global_alpha)
+        loop_particles(config, loop, workers=workers)
+    elif alpha_search:
+        search_alpha_optimized(config, target=alpha_target)
     elif search_alpha:
-        find_alpha()
+        find_alpha(config, workers=workers)
         
     else:
-        run_simulation(alpha=global_alpha)
+        run_simulation(config)
 
@@ -0,0 +1,114 @@
+# deterministic reference solutions for small systems (n = 2 and 3 particles in 1D)
+#
+# Two Hamiltonians in the relative coordinates x_k = r_k - r_0 (k = 1..n-1), both with the pairs of QMC.replica_tot_pots:
+#   * "physical": n particles of mass sys.mass with the centre of mass removed, in terms of the reduced mass 
+#     mu = sys.mu (see utils.system.System):  T = -1/(4 mu) [ sum_k d^2/dx_k^2 + (sum_k d/dx_k)^2 ]
+#     For n = 2 this is -1/(2 mu) d^2/dx^2; for n = 3 it includes the cross term d/dx_1 d/dx_2. 
+#     These are the E_0 values of test/test1.py (-3.094, -9.738 for V_0 = -4.0, R = 2.0, m = 1).
+#   * "model": the kinetic term QMC actually samples, T = -1/(2m) sum_k d^2/dx_k^2 with m = sys.mass 
+#     (one independent unit-mass diffusion per relative coordinate, no cross term).
+# It is discretized on a uniform grid over [-L, L] per relative coordinate with fourth-order finite differences,
+# and the lowest eigenpair is found with sparse Lanczos (scipy.sparse.linalg.eigsh).
+# Results are memoized per (potential, particle_count, hamiltonian, mass, L, h), so repeated checks cost nothing.
+
+import numpy as np
+from scipy.sparse import diags, identity, kron
+from scipy.sparse.linalg import eigsh
+from tabulated import potential_key
+from utils.system import System
+
+_solutions = {} # memoized ReferenceSolution per (potential, particle_count, hamiltonian, mass, L, h)
+
+HAMILTONIANS = ("physical", "model")
+
+# relative deviation of a QMC E_0 from the "model" ground state allowed on top of its statistical error: the time-step
+# and population-control bias at delta_tau = 0.1 (about 0.5% for n = 2 and 0.8% for n = 3)
+BIAS_TOLERANCE = 0.01
+
+class ReferenceSolution:
+    """ Ground state on the grid: E_0, the grid axis and psi (shape (points,) * (particle_count-1), sum(psi^2) h^k = 1). """
+    def __init__(self, E_0, axis, psi, particle_count):
+        self.E_0 = E_0
+        self.axis = axis
+        self.psi = psi
+        self.particle_count = particle_count
+
+    @property
+    def h(self):
+        return self.axis[1] - self.axis[0]
+
+    def coordinates(self):
+        """ The grid points as an array of shape (points**k, k), in the order of psi.ravel(). """
+        return np.stack(np.meshgrid(*[self.axis] * self.psi.ndim, indexing="ij"), axis=-1).reshape(-1, self.psi.ndim)
+
+    def centroid_density(self, bins, lo, hi):
+        """
+        Density of the replica centroid (QMC.centroids) over bins on [lo, hi], comparable to the --density-out histogram;
+        returns (centers, density).
+        """
+        centroids = self.coordinates().sum(axis=1) / self.particle_count
+        counts, edges = np.histogram(centroids, bins=bins, range=(lo, hi), weights=self.psi.ravel()**2 * self.h**self.psi.ndim)
+        return (edges[:-1] + edges[1:]) / 2, counts / (edges[1] - edges[0])
+
+    def __repr__(self):
+        return f"ReferenceSolution(E_0={self.E_0:.6f}, particle_count={self.particle_count}, points={len(self.axis)})"
+
+def finite_difference(points, h, coefficients):
+    """ Five-point stencil (offsets -2..2) on a uniform grid (psi = 0 outside it), as a sparse matrix. """
+    return diags([np.full(points - abs(offset), c) for offset, c in zip(range(-2, 3), coefficients)], range(-2, 3), format="csr")
+
+def laplacian(points, h):
+    """ Fourth-order finite-difference second derivative. """
+    return finite_difference(points, h, np.array([-1, 16, -30, 16, -1]) / (12 * h**2))
+
+def gradient(points, h):
+    """ Fourth-order finite-difference first derivative (antisymmetric, so products of two are symmetric). """
+    return finite_difference(points, h, np.array([1, -8, 0, 8, -1]) / (12 * h))
+
+def solve(V, particle_count=2, sys=None, L=10.0, h=0.1, hamiltonian="physical"):
+    """
+    Ground state of particle_count particles interacting through the pair potential V (memoized).
+    hamiltonian is "physical" (the true relative motion, with sys.mu) or "model" (the kinetic term QMC samples, with sys.mass).
+    Only particle_count = 2 and 3 are supported: the grid has points**(particle_count-1) unknowns.
+    """
+    if particle_count not in (2, 3): raise ValueError(f"The reference solver supports 2 or 3 particles, got {particle_count}")
+    if hamiltonian not in HAMILTONIANS: raise ValueError(f"Unknown hamiltonian '{hamiltonian}', expected one of {HAMILTONIANS}")
+    sys = System() if sys is None else sys
+    key = (potential_key(V), particle_count, hamiltonian, sys.mass, L, h)
+    if key in _solutions: return _solutions[key]
+
+    axis = np.arange(-L, L + h / 2, h)
+    points, k = len(axis), particle_count - 1
+    D2 = laplacian(points, h)
+    I = identity(points, format="csr")
+    if k == 1:
+        laplacians, cross = D2, None
+        V_grid = V(axis)
+    else:
+        laplacians = kron(D2, I, format="csr") + kron(I, D2, format="csr")
+        D1 = gradient(points, h)
+        cross = kron(D1, D1, format="csr") # d/dx_1 d/dx_2
+        x1, x2 = np.meshgrid(axis, axis, indexing="ij")
+        V_grid = (V(x1) + V(x2) + V(x1 - x2)).ravel() # the two direct pairs and the derived one
+    if hamiltonian == "model":
+        kinetic = -0.5 / sys.mass * laplacians
+    else:
+        square_of_sum = laplacians if cross is None else laplacians + 2 * cross # (sum_k d/dx_k)^2
+        kinetic = -0.25 / sys.mu * (laplacians + square_of_sum)
+    H = kinetic + diags(np.ravel(V_grid))
+
+    E, vectors = eigsh(H, k=1, which="SA")
+    psi = vectors[:, 0].reshape((points,) * k)
+    psi *= np.sign(psi.sum()) / np.sqrt((psi**2).sum() * h**k) # nodeless ground state: make it positive
+    _solutions[key] = ReferenceSolution(float(E[0]), axis, psi, particle_count)
+    return _solutions[key]
+
+def check(E_0, error, reference, sigmas=3.0, bias_tolerance=BIAS_TOLERANCE):
+    """ 
+    Checks a QMC estimate E_0 +/- error against a ReferenceSolution (of the "model" Hamiltonian, the one QMC samples).
+    E_0 passes within sigmas errors plus bias_tolerance * |reference E_0| for the time-step bias; 
+    returns (passed, deviation E_0 - reference E_0, allowed deviation).
+    """
+    deviation = float(E_0 - reference.E_0)
+    allowed = float(sigmas * error + bias_tolerance * abs(reference.E_0))
+    return abs(deviation) <= allowed, deviation, allowed
@@ -0,0 +1,23 @@
+# parallel execution of independent simulation runs (used by the --loop and --gda modes of qmc_cli.py)
+
+from concurrent.futures import ProcessPoolExecutor
+
+def spawn_keys(count, parent=()):
+    """ 
+    SeedSequence spawn keys for count independent child streams of one base seed (QMC(seed=..., spawn_key=key)).
+    These are the keys SeedSequence(seed).spawn(count) would give, so each run's stream depends only on the
+    base seed and its position in the sweep, never on how many workers run them.
+    """
+    return [(*parent, i) for i in range(count)]
+
+def run_sweep(run, configs, workers=1):
+    """ 
+    Calls run(config) for every config and returns the results in input order.
+    With workers > 1 the runs are spread over a process pool; run and the configs must be picklable.
+    """
+    configs = list(configs)
+    if workers is None or workers <= 1 or len(configs) <= 1:
+        return [run(config) for config in configs]
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(configs))) as pool:
+        return list(pool.map(run, configs))
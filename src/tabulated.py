@@ -0,0 +1,101 @@
+# tabulated potentials: V(x) sampled once on a uniform grid and evaluated by vectorized interpolation
+#
+# Useful when V is an expensive composite function; QMC evaluates V on O(walkers x n^2) distances each step.
+
+import hashlib
+import numpy as np
+
+_tables = {} # memoized tables, keyed by (potential_key(V), lo, hi, kind, tol)
+
+def potential_key(V):
+    """ 
+    A string identifying the potential V together with its parameters, for the caches of tables, reference solutions
+    and populations (a TabulatedPotential has the key of its exact potential).
+    repr(V) is not enough: utils.potential.Potential.__repr__ is just the name, shared by all parameter values.
+    A potential can provide its own key with a cache_key() method.
+    Instances are described by their class and attributes (arrays by a digest of their contents); functions and objects
+    without attributes by their repr. Values whose repr includes a memory address make the key unique to the process.
+    """
+    V = getattr(V, "exact", V)
+    if callable(getattr(V, "cache_key", None)): return str(V.cache_key())
+    if not hasattr(V, "__dict__") or isinstance(V, type) or hasattr(V, "__code__"): return repr(V)
+    def describe(value):
+        if isinstance(value, np.ndarray): 
+            return f"array({value.dtype}, {value.shape}, sha1={hashlib.sha1(np.ascontiguousarray(value).tobytes()).hexdigest()})"
+        return repr(value)
+    parameters = ", ".join(f"{name}={describe(value)}" for name, value in sorted(vars(V).items()))
+    return f"{type(V).__module__}.{type(V).__qualname__}({parameters})"
+
+class TabulatedPotential:
+    """ 
+    V(x) tabulated on a uniform grid over [lo, hi], evaluated by linear or cubic (Hermite) interpolation. 
+    Points outside [lo, hi] are evaluated with the exact function.
+    """
+    def __init__(self, V, lo, hi, kind="cubic", tol=1e-6, points=1025, max_points=2**20):
+        if kind not in ("linear", "cubic"): raise ValueError(f"Unknown interpolation kind '{kind}', expected 'linear' or 'cubic'")
+        if not hi > lo: raise ValueError(f"Empty table range [{lo}, {hi}]")
+
+        self.exact = V
+        self.lo = float(lo)
+        self.hi = float(hi)
+        self.kind = kind
+        self.tol = tol
+
+        # keep doubling the grid until the interpolation error between grid points is below tol
+        while True:
+            self.build(points)
+            self.error = self.max_error()
+            if self.error <= tol: break
+            if 2*points - 1 > max_points:
+                raise ValueError(f"Could not tabulate {V!r} on [{lo}, {hi}] to tol={tol} with {max_points} points (error {self.error:.3g})")
+            points = 2*points - 1
+
+    def build(self, points):
+        """ Samples the exact potential (and, for cubic interpolation, its slope) on the grid. """
+        self.xs = np.linspace(self.lo, self.hi, points)
+        self.h = self.xs[1] - self.xs[0]
+        self.ys = np.asarray(self.exact(self.xs), dtype=float)
+        self.dys = np.gradient(self.ys, self.h, edge_order=2) * self.h # slopes in units of the grid spacing
+
+    def max_error(self):
+        """ Largest deviation from the exact potential at the quarter points of every grid interval. """
+        probes = (self.xs[:-1, np.newaxis] + self.h * np.array([0.25, 0.5, 0.75])).ravel()
+        return np.max(np.abs(self.interpolate(probes) - self.exact(probes)))
+
+    def interpolate(self, x):
+        """ Interpolates the table at points x, which must lie inside [lo, hi]. """
+        u = (x - self.lo) / self.h
+        i = np.minimum(u.astype(int), len(self.xs) - 2)
+        t = u - i
+        y0, y1 = self.ys[i], self.ys[i+1]
+        if self.kind == "linear":
+            return y0 + t * (y1 - y0)
+
+        d0, d1 = self.dys[i], self.dys[i+1]
+        t2 = t*t
+        t3 = t2*t
+        return (2*t3 - 3*t2 + 1) * y0 + (t3 - 2*t2 + t) * d0 + (-2*t3 + 3*t2) * y1 + (t3 - t2) * d1
+
+    def __call__(self, x):
+        x = np.asarray(x, dtype=float)
+        inside = (x >= self.lo) & (x <= self.hi)
+        if inside.all():
+            V = self.interpolate(x)
+        else:
+            V = np.empty_like(x)
+            V[inside] = self.interpolate(x[inside])
+            V[~inside] = self.exact(x[~inside])
+        return V if V.ndim else float(V)
+
+    def __repr__(self):
+        return f"TabulatedPotential({self.exact!r}, lo={self.lo}, hi={self.hi}, kind={self.kind}, points={len(self.xs)})"
+
+def tabulate(V, lo, hi, kind="cubic", tol=1e-6):
+    """ 
+    Returns a TabulatedPotential for V over [lo, hi], reusing an earlier table with the same parameters.
+    Tables are keyed by potential_key(V), so equal potentials like V_Gauss(V0, R) share a table across runs and sweeps.
+    """
+    key = (potential_key(V), float(lo), float(hi), kind, tol)
+    if key not in _tables:
+        _tables[key] = TabulatedPotential(V, lo, hi, kind=kind, tol=tol)
+    return _tables[key]
@@ -0,0 +1,86 @@
+# step observers for QMC (see QMC.add_observer)
+#
+#   * Observer: the callback interface, both hooks do nothing by default
+#   * Profiler: per-phase wall-clock timers, branching counters and population high-water marks,
+#               written out as a JSON summary or a per-step CSV table
+
+import csv
+import json
+import time
+
+class Observer:
+    """ Base class for step observers; override either hook. """
+    def on_phase(self, qmc, name, seconds):
+        """ Called after each phase of a step with its wall-clock time in seconds. """
+        pass
+
+    def on_step(self, qmc):
+        """ Called once each step is complete (qmc.N, qmc.E_ref, qmc.births, ... are up to date). """
+        pass
+
+class Profiler(Observer):
+    """
+    Collects timings and population statistics while attached to a QMC:
+       * total and per-step wall-clock time of every phase of the backend's step
+       * births (copies made), deaths and copies dropped at capacity per step
+       * the population high- and low-water marks
+    """
+    COLUMNS = ("step", "N", "E_ref", "births", "deaths", "dropped")
+
+    def __init__(self):
+        self.phase_totals = {}  # phase name -> total seconds
+        self.phase_calls = {}   # phase name -> number of times it ran
+        self.rows = []          # one row per step: COLUMNS followed by the seconds spent in each phase
+        self.current = {}       # phase timings of the step in progress
+        self.N_max = None
+        self.N_min = None
+        self.started = time.perf_counter()
+
+    def on_phase(self, qmc, name, seconds):
+        self.phase_totals[name] = self.phase_totals.get(name, 0.0) + seconds
+        self.phase_calls[name] = self.phase_calls.get(name, 0) + 1
+        self.current[name] = seconds
+
+    def on_step(self, qmc):
+        self.N_max = qmc.N if self.N_max is None else max(self.N_max, qmc.N)
+        self.N_min = qmc.N if self.N_min is None else min(self.N_min, qmc.N)
+        self.rows.append(dict(step=qmc.step_count, N=qmc.N, E_ref=qmc.E_ref, births=qmc.births, deaths=qmc.deaths,
+                              dropped=qmc.dropped, **self.current))
+        self.current = {}
+
+    def summary(self):
+        """ Totals over every step observed so far, as a JSON-friendly dict. """
+        steps = len(self.rows)
+        timed = sum(self.phase_totals.values())
+        phases = {name: dict(total=total,
+                             mean=total / self.phase_calls[name],
+                             fraction=total / timed if timed > 0 else 0.0)
+                  for name, total in self.phase_totals.items()}
+        return dict(steps=steps,
+                    wall_time=time.perf_counter() - self.started,
+                    phase_time=timed,
+                    phases=phases,
+                    N_max=self.N_max,
+                    N_min=self.N_min,
+                    births=sum(row["births"] for row in self.rows),
+                    deaths=sum(row["deaths"] for row in self.rows),
+                    dropped=sum(row["dropped"] for row in self.rows))
+
+    def write(self, path):
+        """ Writes the per-step table if path ends in .csv, otherwise the summary as JSON. """
+        if str(path).endswith(".csv"):
+            with open(path, "w", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=[*self.COLUMNS, *self.phase_totals])
+                writer.writeheader()
+                writer.writerows(self.rows)
+        else:
+            with open(path, "w") as f:
+                json.dump(self.summary(), f, indent=2)
+
+    def __str__(self):
+        summary = self.summary()
+        lines = [f"profile: {summary['steps']} steps in {summary['wall_time']:.3f}s  N_max: {self.N_max}  N_min: {self.N_min}  "
+                 f"births: {summary['births']}  deaths: {summary['deaths']}  dropped: {summary['dropped']}"]
+        for name, phase in summary["phases"].items():
+            lines.append(f"  {name:<22} {phase['total']:9.4f}s  {100 * phase['fraction']:5.1f}%  {1e6 * phase['mean']:9.1f}us/step")
+        return "\n".join(lines)
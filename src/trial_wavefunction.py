@@ -0,0 +1,95 @@
+# trial wave functions for importance-sampled DMC
+#
+# With a trial wave function Psi_T the walkers sample f = Psi_T * Psi_0 instead of Psi_0:
+#   * Walk adds the drift  delta_tau * grad(ln Psi_T)  to the Gaussian step
+#   * Branch uses the local energy  E_L = (H Psi_T) / Psi_T  instead of V
+# For the Hamiltonian QMC simulates (H = -1/2 sum_i d^2/dx_i^2 + V, one term per relative coordinate) this gives
+#   E_L = -1/2 (laplacian(ln Psi_T) + |grad(ln Psi_T)|^2) + V
+
+import numpy as np
+
+def per_replica_sum(values):
+    """ Sums everything but the replica axis (relative coordinates and, with dim > 1, their components). """
+    return values.reshape(len(values), -1).sum(axis=1)
+
+class TrialWaveFunction:
+    """ Interface for trial wave functions; xs has shape (replicas, particle_count-1), or (replicas, particle_count-1, dim). """
+    def log_psi(self, xs):
+        raise RuntimeError("Abstract method call!")
+
+    def grad_log_psi(self, xs):
+        """ grad(ln Psi_T) with respect to every relative coordinate, same shape as xs (the drift velocity). """
+        raise RuntimeError("Abstract method call!")
+
+    def laplacian_log_psi(self, xs):
+        """ laplacian(ln Psi_T), one value per replica. """
+        raise RuntimeError("Abstract method call!")
+
+    def local_energy(self, xs, V_tots):
+        """ E_L for every replica, given the total potential V_tots of each replica. """
+        grad = self.grad_log_psi(xs)
+        return -0.5 * (self.laplacian_log_psi(xs) + per_replica_sum(grad**2)) + V_tots
+
+class GaussianPairTrial(TrialWaveFunction):
+    """ 
+    Psi_T = prod over all pairs of exp(-a d^2), where d runs over the directly stored relative distances x_i 
+    and the derived distances x_i - x_j (the same pairs QMC.replica_tot_pots sums V over).
+    """
+    def __init__(self, a):
+        if a <= 0: raise ValueError("The Gaussian trial exponent a must be positive")
+        self.a = a
+
+    @classmethod
+    def matched(cls, V, particle_count, samples=4000, seed=0, dim=1):
+        """ 
+        Trial matched to the pair potential V: picks the exponent a that minimizes the variance of E_L.
+        Psi_T^2 is a multivariate Gaussian in the relative coordinates, so it is sampled exactly (with a private generator, 
+        leaving the simulation's random stream untouched) for every candidate a on a log-spaced grid.
+        With dim > 1 every Cartesian component is an independent copy of the 1D Gaussian.
+        """
+        from model import pair_distances
+        k = particle_count - 1
+        # sum over pairs of d^2 = x^T (n I - J) x, so Psi_T^2 = exp(-2a x^T A x) has covariance (4a A)^-1
+        A = particle_count * np.eye(k) - np.ones((k, k))
+        eta = np.random.default_rng(seed).normal(size=(samples, k) if dim == 1 else (samples, k, dim))
+
+        best = None
+        for a in np.geomspace(0.01, 2.0, 60):
+            xs = np.einsum("lk,sk...->sl...", np.linalg.cholesky(np.linalg.inv(4 * a * A)), eta)
+            V_tots = V(pair_distances(xs)).sum(axis=1)
+            variance = cls(a).local_energy(xs, V_tots).var()
+            if best is None or variance < best[0]: best = (variance, a)
+        return cls(best[1])
+
+    @classmethod
+    def fitted(cls, reference):
+        """ 
+        Trial with the largest overlap <Psi_T|Psi_0> with the exact ground state of a reference.ReferenceSolution
+        (deterministic, no sampling), over the same log-spaced grid of exponents as matched.
+        """
+        xs = reference.coordinates()
+        psi_0 = reference.psi.ravel()
+        best = None
+        for a in np.geomspace(0.01, 2.0, 60):
+            psi_T = np.exp(cls(a).log_psi(xs))
+            overlap = (psi_0 * psi_T).sum() / np.sqrt((psi_T**2).sum() * (psi_0**2).sum())
+            if best is None or overlap > best[0]: best = (overlap, a)
+        return cls(best[1])
+
+    def log_psi(self, xs):
+        i, j = np.triu_indices(xs.shape[1], k=1)
+        return -self.a * (per_replica_sum(xs**2) + per_replica_sum((xs[:, i] - xs[:, j])**2))
+
+    def grad_log_psi(self, xs):
+        # d ln Psi / dx_k = -2a x_k  - 2a * sum_{j != k} (x_k - x_j)  =  -2a (n x_k - sum_j x_j)
+        n = xs.shape[1] + 1
+        return -2 * self.a * (n * xs - xs.sum(axis=1, keepdims=True))
+
+    def laplacian_log_psi(self, xs):
+        # -2a for every coordinate (and Cartesian component) in every pair it belongs to: (n-1) direct pairs plus 2 * (n-1)(n-2)/2 derived ones
+        k = xs.shape[1]
+        dim = xs.shape[2] if xs.ndim == 3 else 1
+        return np.full(len(xs), -2 * self.a * dim * (k + k * (k - 1)))
+
+    def __repr__(self):
+        return f"GaussianPairTrial(a={self.a})"
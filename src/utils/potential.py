@@ -15,12 +15,28 @@
 # Last update: Aug 11, 2021
 
 from .system import System
-from .riccati import riccati_j
+from .riccati import riccati_j, riccati_j_table
 
 import numpy as np
-import matplotlib.pyplot as plt
 
-from scipy.integrate import quad
+# matplotlib and scipy.integrate are imported inside show and get, so that
+# potentials can be evaluated without loading them.
+
+# Gauss-Legendre radial meshes, memoized per (points, scale)
+_radial_meshes = {}
+
+def radial_mesh(n=128, scale=1.0):
+  # Gauss-Legendre quadrature for integrals over [0, inf): the nodes x on [-1, 1]
+  # are mapped by r = scale * tan(pi/4 * (1 + x)), so half of them lie below
+  # r = scale.  Returns (rs, ws).
+  key = (n, scale)
+  if key not in _radial_meshes:
+    x, w = np.polynomial.legendre.leggauss(n)
+    t = 0.25 * np.pi * (1.0 + x)
+    rs = scale * np.tan(t)
+    ws = scale * 0.25 * np.pi * w / np.cos(t)**2
+    _radial_meshes[key] = (rs, ws)
+  return _radial_meshes[key]
 
 class Potential:
   def __init__(self, sys, name):
@@ -33,7 +49,17 @@ class Potential:
   def get(self, ell, p, q):
     raise RuntimeError("Abstract method call!")
 
+  def get_matrix(self, ell, ps, qs=None):
+    # Matrix of partial-wave projected elements V(p, q) for all ps (rows) and
+    # qs (columns, defaults to ps).  Generic fallback: one call to get per
+    # element; subclasses provide vectorized versions.
+    ps = np.asarray(ps, dtype=float)
+    qs = ps if qs is None else np.asarray(qs, dtype=float)
+    return np.array([[self.get(ell, p, q) for q in qs] for p in ps])
+
   def show(self, rep='p', ell=0, **kwargs):
+    import matplotlib.pyplot as plt
+
     if rep != 'p':
       raise RuntimeError("Unsupported potential representation!")
 
@@ -42,12 +68,11 @@ class Potential:
 
     xs = np.linspace(1e-6, m, num=n)
     px, py = np.meshgrid(xs, xs)
-    v = np.vectorize(self.get, excluded=["ell"])
 
     plt.xlabel("p")
     plt.ylabel("p\'")
     plt.text(0.9 * m, 0.9 * m, "ell = %d" % (ell), ha="right", va="top")
-    plt.contourf(px, py, v(ell, px, py), levels=n)
+    plt.contourf(px, py, self.get_matrix(ell, xs).T, levels=n)
     plt.axis("scaled")
     plt.title(str(self))
     plt.show()
@@ -63,14 +88,31 @@ class LocalPotential(Potential):
     # For convenience we define here a generic method to calculate partial-
     # wave projected momentum-space matrix elements.  Subclasses may override
     # this implementation to improve speed and/or accuracy.
+    from scipy.integrate import quad
 
     return 4.0 * np.pi / (q * p) * quad( \
       lambda r: riccati_j(ell, p * r) * self(r) * riccati_j(ell, q * r), \
       0.0, np.inf \
     )[0]
 
+  def get_matrix(self, ell, ps, qs=None, n=128, scale=1.0):
+    # Bulk version of get: all elements share one Gauss-Legendre radial mesh
+    # (see radial_mesh), so the matrix is
+    #   V(p, q) = 4 pi / (p q) * sum_k w_k j(p r_k) V(r_k) j(q r_k)
+    # with the Riccati-Bessel tables j computed once per (ell, mesh).
+    # The mesh must resolve both the range of V and the oscillations of
+    # j(p r) for the largest momenta; increase n for large p.
+    ps = np.asarray(ps, dtype=float)
+    qs = ps if qs is None else np.asarray(qs, dtype=float)
+    rs, ws = radial_mesh(n, scale)
+    jp = riccati_j_table(ell, ps, rs)
+    jq = jp if qs is ps else riccati_j_table(ell, qs, rs)
+    return 4.0 * np.pi * ((jp * (ws * self(rs))) @ jq.T) / np.multiply.outer(ps, qs)
+
   def show(self, rep='r', ell=0, **kwargs):
     if rep == 'r':
+      import matplotlib.pyplot as plt
+
       m = kwargs.get("max", 10.0)
       n = kwargs.get("num", 32)
 
@@ -115,5 +157,13 @@ class V_Gauss(LocalPotential):
     else:
       return super().get(ell, p, q)
 
+  def get_matrix(self, ell, ps, qs=None, **kwargs):
+    # ell = 0 has a closed form (see get), which broadcasts over the mesh.
+    if ell == 0:
+      ps = np.asarray(ps, dtype=float)
+      qs = ps if qs is None else np.asarray(qs, dtype=float)
+      return self.get(0, ps[:, np.newaxis], qs[np.newaxis, :])
+    return super().get_matrix(ell, ps, qs, **kwargs)
+
   def __repr__(self):
     return "V_Gauss(V0=%s, R=%s)" % (self.V0, self.R)
@@ -14,10 +14,36 @@
 #
 # Last update: Aug 11, 2021
 
-from scipy.special import riccati_jn, riccati_yn
+# scipy.special is imported on first use, so importing this module stays cheap.
+
+import numpy as np
 
 def riccati_j(ell, z):
+  from scipy.special import riccati_jn
   return riccati_jn(ell, z)[0][-1]
 
 def riccati_n(ell, z):
+  from scipy.special import riccati_yn
   return -riccati_yn(ell, z)[0][-1]
+
+# Riccati-Bessel tables, memoized per (ell, momentum mesh, radial mesh)
+_riccati_j_tables = {}
+
+def riccati_j_array(ell, z):
+  # Vectorized riccati_j: z * j_ell(z) for an array of arguments (order ell only,
+  # without building the sequence 0..ell for every point).
+  from scipy.special import spherical_jn
+  z = np.asarray(z, dtype=float)
+  return z * spherical_jn(ell, z)
+
+def riccati_j_table(ell, ps, rs):
+  # Matrix riccati_j(ell, p * r) with rows ps and columns rs, computed once per
+  # (ell, ps, rs) and cached (the returned array must not be modified).
+  ps = np.ascontiguousarray(ps, dtype=float)
+  rs = np.ascontiguousarray(rs, dtype=float)
+  key = (ell, ps.tobytes(), rs.tobytes())
+  if key not in _riccati_j_tables:
+    table = riccati_j_array(ell, np.multiply.outer(ps, rs))
+    table.flags.writeable = False
+    _riccati_j_tables[key] = table
+  return _riccati_j_tables[key]
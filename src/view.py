@@ -1,6 +1,33 @@
+# plotting helpers; matplotlib is only loaded when this module is imported (qmc_cli.py imports it only to plot).
+# Every plot is shown interactively, or written to a file (PNG, SVG, ... by extension) when out is given;
+# qmc_cli.py --plot-out selects the non-interactive Agg backend before importing this module.
+
 import matplotlib.pyplot as plt
 import numpy as np
 
+def decimate(xs, ys, buckets):
+    """ 
+    Reduces a long series to the minimum and maximum of each of buckets equal slices (in their original order),
+    so a line plot with one bucket per pixel looks the same as the full series. Short series are returned unchanged.
+    """
+    xs, ys = np.asarray(xs), np.asarray(ys)
+    if len(ys) <= 2 * buckets: return xs, ys
+    size = len(ys) // buckets
+    stop = size * buckets
+    slices = ys[:stop].reshape(buckets, size)
+    lo, hi = slices.argmin(axis=1), slices.argmax(axis=1)
+    keep = np.arange(buckets)[:, np.newaxis] * size + np.sort(np.stack((lo, hi), axis=1), axis=1)
+    keep = np.concatenate((keep.ravel(), np.arange(stop, len(ys)))) # the remainder after the last full bucket is short
+    return xs[keep], ys[keep]
+
+def show_or_save(out):
+    """ Shows the current figure, or writes it to out and closes it. """
+    if out is None:
+        plt.show()
+    else:
+        plt.savefig(out, bbox_inches="tight")
+        plt.close()
+
 def mean(lst, pct_val = 0.5):
     
     # mean_val = mean_last_r(ys, int(len(ys)*pct_val)) # get the mean using the last 10% of the data
@@ -19,32 +46,48 @@ def mean_stddev(lst, pct_val = 0.5):
     stddev = np.std(last_percent_data)
     return mean, stddev, start_index
     
-def plot_data(ys, n_vals, hist_data, bins, title="QMC Simulation", samp_pct=0.5):
-    """ Plots the data with an inset histogram. """
-
-    mean_val, stddev, range_start = mean_stddev(ys, pct_val=samp_pct)
+def plot_data(ys, n_vals, hist_data, bins, title="QMC Simulation", samp_pct=0.5, E_0=None, first_step=0, range_start=None, out=None):
+    """ 
+    Plots the data with an inset histogram. 
+    
+    hist_data is either raw positions (histogrammed into bins) or a (centers, density) pair from an accumulated 
+    Histogram; the inset is skipped when it is None.
+    
+    ys may be only the recent history of a run (e.g. from a RingBuffer): first_step is the step number of ys[0].
+    E_0 = (mean, stddev) and range_start (step number where the E_0 window begins) can be passed in from
+    streaming accumulators; otherwise they are computed from ys with mean_stddev.
+    Long series are decimated to the min/max of each pixel column before drawing (see decimate).
+    """
+    ys = np.asarray(ys)
+
+    if E_0 is None:
+        mean_val, stddev, range_start = mean_stddev(ys, pct_val=samp_pct)
+        range_start += first_step
+    else:
+        mean_val, stddev = E_0
+    range_start = max(range_start - first_step, 0) # index into ys
     range_stop = len(ys)
 
-    xs = range(range_stop)
+    xs = np.arange(first_step, first_step + range_stop)
 
     # Create a new figure for the main plot
-    plt.figure()
+    figure = plt.figure()
     
-    min_val = min(ys)
-    max_val = max(ys)
+    min_val = ys.min()
+    max_val = ys.max()
     mid_val = (max_val - min_val) / 2   + min_val
     # print(f"min_val: {min_val}  max_val: {max_val}  mid_val: {mid_val}")
 
 
     # Plot x vs y
     sfact = 1.1
-    plt.plot(xs, ys, label="E_ref")
+    plt.plot(*decimate(xs, ys, int(figure.get_figwidth() * figure.dpi)), label="E_ref")
     plt.xlabel('Time Step')
     plt.ylabel('E_ref')
     plt.title(title, fontsize=16)
-    plt.hlines(mean_val, xmin = 0, xmax=range_stop, colors='r', linestyles='solid', label='E_0')
-    plt.fill_between(xs[range_start:range_stop], mean_val - sfact*stddev, mean_val + sfact*stddev, color='b', alpha=0.3)
-    text_x_position = 0.95 * len(xs)  # X position near the right edge of the plot
+    plt.hlines(mean_val, xmin = first_step, xmax=first_step + range_stop, colors='r', linestyles='solid', label='E_0')
+    plt.fill_between(xs[[range_start, range_stop - 1]], mean_val - sfact*stddev, mean_val + sfact*stddev, color='b', alpha=0.3)
+    text_x_position = first_step + 0.95 * len(xs)  # X position near the right edge of the plot
     text_y_position = mid_val + 0.03  # Y position for the text just above the line
     plt.text(text_x_position, text_y_position, 
              f"E_0: {mean_val:.3f} +/- {stddev:.3f}", 
@@ -57,22 +100,27 @@ def plot_data(ys, n_vals, hist_data, bins, title="QMC Simulation", samp_pct=0.5)
     plt.legend(loc='lower right')
     # Create an inset plot for the histogram
     # The arguments are [left, bottom, width, height] in figure coordinate
-    plot_inset = False
+    plot_inset = hist_data is not None
     if plot_inset:
         ax_inset = plt.axes([0.45, 0.2, 0.4, 0.4])  # Modify these values to adjust the position and size of the inset
-        ax_inset.hist(hist_data, bins=bins, color='green', alpha=0.5)
+        if isinstance(hist_data, tuple):
+            centers, density = hist_data
+            ax_inset.fill_between(centers, density, step='mid', color='green', alpha=0.5)
+            ax_inset.set_ylabel('Density')
+        else:
+            ax_inset.hist(hist_data, bins=bins, color='green', alpha=0.5)
+            ax_inset.set_ylabel('Count')
         ax_inset.set_title("Ground State Wave Function")
         ax_inset.set_xlabel('Position')
-        ax_inset.set_ylabel('Count')
 
     # Show the plot
-    plt.show()
+    show_or_save(out)
     
 
-def plot_energy_vs_alpha(alpha_xs, energy_ys, title="Energy vs Alpha"):
+def plot_energy_vs_alpha(alpha_xs, energy_ys, title="Energy vs Alpha", out=None):
     """ Plots the data with an inset histogram. """
 
-    mean_val, stddev = mean_stddev(energy_ys)
+    mean_val, stddev, _ = mean_stddev(energy_ys)
 
     # Create a new figure for the main plot
     plt.figure()
@@ -99,10 +147,10 @@ def plot_energy_vs_alpha(alpha_xs, energy_ys, title="Energy vs Alpha"):
     plt.legend(loc='lower right')
  
     # Show the plot
-    plt.show()
+    show_or_save(out)
 
     
-def plot_histogram(data, bins, title = "QMC Simulation"):
+def plot_histogram(data, bins, title = "QMC Simulation", out=None):
     """ Plots the data. """
     
     # Create a new figure
@@ -120,5 +168,5 @@ def plot_histogram(data, bins, title = "QMC Simulation"):
     # plt.legend()
 
     # Show the plot
-    plt.show()
+    show_or_save(out)
     
\ No newline at end of file
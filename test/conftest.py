@@ -0,0 +1,6 @@
+# the modules under test live in ../src and import each other by bare name (as qmc_cli.py does)
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
@@ -0,0 +1,78 @@
+# streaming accumulators against their batch numpy equivalents
+
+import numpy as np
+import pytest
+
+from accumulators import Welford, RingBuffer, WindowedAccumulator, BlockingAnalyzer, DriftDetector
+
+def test_welford_matches_numpy():
+    xs = np.random.default_rng(0).normal(3.0, 2.0, 1000)
+    stats = Welford()
+    for x in xs: stats.push(x)
+    assert stats.n == len(xs)
+    assert stats.mean == pytest.approx(xs.mean(), rel=1e-12)
+    assert stats.variance == pytest.approx(xs.var(), rel=1e-10)
+
+def test_welford_pop_undoes_push():
+    xs = np.random.default_rng(1).normal(-3.3, 0.1, 200)
+    stats = Welford()
+    for x in xs: stats.push(x)
+    for x in xs[:150]: stats.pop(x)
+    assert stats.mean == pytest.approx(xs[150:].mean(), rel=1e-10)
+    assert stats.variance == pytest.approx(xs[150:].var(), rel=1e-6)
+    for x in xs[150:]: stats.pop(x)
+    assert (stats.n, stats.mean, stats.variance) == (0, 0.0, 0.0)
+
+def test_ring_buffer_keeps_the_newest_values():
+    buffer = RingBuffer(4)
+    for x in range(10): buffer.push(x)
+    assert len(buffer) == 4 and buffer.start == 6 and buffer.oldest() == 6
+    assert list(buffer.values()) == [6, 7, 8, 9]
+
+def test_windowed_accumulator_matches_last_window():
+    xs = np.random.default_rng(2).normal(size=1000)
+    window = WindowedAccumulator(100)
+    for i, x in enumerate(xs):
+        window.push(x)
+        if i % 97 == 0 or i == len(xs) - 1:
+            last = xs[max(i - 99, 0):i + 1]
+            assert window.mean == pytest.approx(last.mean(), abs=1e-12)
+            assert window.stddev == pytest.approx(last.std(), rel=1e-6)
+
+def ar1(phi, n, seed):
+    """ x_t = phi x_{t-1} + eta_t, whose integrated autocorrelation time is (1 + phi) / (2 (1 - phi)). """
+    eta = np.random.default_rng(seed).normal(size=n)
+    xs = np.empty(n)
+    xs[0] = eta[0] / np.sqrt(1 - phi**2)
+    for t in range(1, n): xs[t] = phi * xs[t-1] + eta[t]
+    return xs
+
+@pytest.mark.parametrize("phi", [0.0, 0.5, 0.9])
+def test_blocking_recovers_tau_int_of_ar1(phi):
+    xs = ar1(phi, 2**16, seed=3)
+    blocking = BlockingAnalyzer()
+    for x in xs: blocking.push(x)
+    tau = (1 + phi) / (2 * (1 - phi))
+    assert blocking.converged
+    assert blocking.mean == pytest.approx(xs.mean())
+    assert blocking.tau_int == pytest.approx(tau, rel=0.2)
+    assert blocking.error == pytest.approx(xs.std() * np.sqrt(2 * tau / len(xs)), rel=0.1)
+
+def test_blocking_short_series_is_not_converged():
+    blocking = BlockingAnalyzer()
+    for x in ar1(0.9, 30, seed=4): blocking.push(x) # only level 0 has min_blocks blocks: no plateau can be seen
+    assert not blocking.converged
+    assert np.isnan(blocking.error) and np.isnan(blocking.tau_int)
+    assert blocking.error_lower_bound > 0
+    empty = BlockingAnalyzer()
+    assert not empty.converged and np.isnan(empty.error) and np.isnan(empty.error_lower_bound)
+
+def test_drift_detector_waits_for_a_stationary_series():
+    noise = ar1(0.5, 1200, seed=3)
+    drift = DriftDetector(window=100)
+    flags = []
+    for i, x in enumerate(noise):
+        drift.push(x + max(0.0, 1.0 - i / 400) * 10.0) # decays linearly onto a stationary AR(1) series by step 400
+        flags.append(drift.equilibrated)
+    assert 400 <= flags.index(True) <= 600 # the first pass (where run_simulation starts E_0) comes once the drift has stopped
+    assert np.mean(flags[600:]) > 0.6      # stationary: only the z = 2 false alarms remain
@@ -0,0 +1,15 @@
+# adaptive runs: equilibration detection, then stop once the blocking error of E_0 reaches target_error
+
+import re
+
+from qmc_cli import RunConfig, run_simulation
+
+def test_adaptive_run_stops_at_the_target_error(capsys):
+    config = RunConfig(particles=2, min_replicas=300, max_steps=4000, target_error=0.005, seed=3)
+    E_0, E_0_error, N = run_simulation(config)
+    stopped = re.search(r"TARGET ERROR MET @ step: (\d+)  \(equilibrated @ step: (\d+)\)", capsys.readouterr().out)
+    assert stopped is not None
+    step, equilibrated = map(int, stopped.groups())
+    assert equilibrated < config.max_steps // 2 and step + 1 < config.max_steps
+    assert step + 1 - equilibrated >= config.min_samples
+    assert E_0_error <= config.target_error
@@ -0,0 +1,28 @@
+# AlphaSearch: coarse grid + golden-section refinement with memoized candidates
+
+import pytest
+
+from alpha_search import AlphaSearch
+
+def test_search_finds_minimum_with_few_evaluations():
+    batches = []
+    def run(alphas):
+        batches.append(list(alphas))
+        return [(alpha - 0.37)**2 for alpha in alphas]
+
+    search = AlphaSearch(run, score=lambda result: result, tol=0.002)
+    assert search.search() == pytest.approx(0.37, abs=0.002)
+    assert search.evaluations <= 25 # a 1000 point scan would need 1000
+    assert len(batches[0]) == search.grid # the coarse grid is simulated as one batch
+
+def test_candidates_are_memoized():
+    calls = []
+    search = AlphaSearch(lambda alphas: calls.extend(alphas) or [0.0] * len(alphas), score=lambda result: result)
+    search.evaluate([0.2, 0.3])
+    search.evaluate([0.3, 0.2, 0.4, 0.4])
+    assert calls == [0.2, 0.3, 0.4]
+
+def test_options_the_ensembles_ignore_are_rejected():
+    from qmc_cli import RunConfig, search_alpha_optimized
+    with pytest.raises(ValueError, match="--tabulate, --backend"):
+        search_alpha_optimized(RunConfig(tabulate_V=True, backend="jit"))
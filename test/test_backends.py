@@ -0,0 +1,66 @@
+# parity check between the numpy and jit compute backends (reference Gaussian case, V_0 = -4.0, R = 2.0)
+
+import os
+
+import numpy as np
+import pytest
+
+from model import QMC
+from utils.potential import V_Gauss
+
+def E_0_estimate(backend, seed, steps=400, samp_pct=0.5):
+    qmc = QMC(V=V_Gauss(None, -4.0, 2.0), particle_count=2, min_replicas=500, max_replicas=3000, 
+              seed=seed, alpha=0.13, backend=backend, workers=2)
+    E_refs = []
+    for _ in range(steps):
+        qmc.step()
+        E_refs.append(qmc.E_ref)
+    qmc.close()
+    return np.mean(E_refs[-int(steps*samp_pct):])
+
+def test_jit_matches_numpy():
+    pytest.importorskip("numba")
+    seeds = range(8)
+    numpy_E0 = np.array([E_0_estimate("numpy", seed) for seed in seeds])
+    jit_E0 = np.array([E_0_estimate("jit", seed + 1000) for seed in seeds])
+    error = np.sqrt(numpy_E0.var(ddof=1)/len(seeds) + jit_E0.var(ddof=1)/len(seeds))
+    assert abs(numpy_E0.mean() - jit_E0.mean()) < 4*error + 1e-3
+
+def test_jit_falls_back_without_gauss_potential():
+    with pytest.warns(UserWarning):
+        qmc = QMC(V=lambda x: -4.0*np.exp(-x**2/4.0), particle_count=2, min_replicas=10, backend="jit")
+    assert qmc.backend == "numpy"
+
+def test_parallel_is_independent_of_worker_count():
+    E_refs = []
+    for workers in (1, 3):
+        qmc = QMC(V=V_Gauss(None, -4.0, 2.0), particle_count=3, min_replicas=1200, seed=7, backend="parallel", workers=workers)
+        for _ in range(20): qmc.step()
+        qmc.close()
+        E_refs.append((qmc.E_ref, qmc.N))
+    assert E_refs[0] == E_refs[1]
+
+def test_parallel_matches_numpy():
+    numpy_E0 = np.array([E_0_estimate("numpy", seed) for seed in range(4)])
+    parallel_E0 = np.array([E_0_estimate("parallel", seed) for seed in range(4)])
+    error = np.sqrt(numpy_E0.var(ddof=1)/4 + parallel_E0.var(ddof=1)/4)
+    assert abs(numpy_E0.mean() - parallel_E0.mean()) < 4*error + 1e-3
+
+def test_pair_cutoff_stays_within_error_bound():
+    V = V_Gauss(None, -4.0, 2.0)
+    full = QMC(V=V, particle_count=12, min_replicas=10)
+    cut = QMC(V=V, particle_count=12, min_replicas=10, pair_cutoff=6.0)
+    xs = np.random.default_rng(0).normal(scale=8.0, size=(400, 11))
+    assert np.all(np.abs(full.replica_tot_pots(xs) - cut.replica_tot_pots(xs)) <= cut.pair_cutoff_error)
+    with pytest.warns(UserWarning):
+        assert QMC(V=V, particle_count=3, min_replicas=10, pair_cutoff=6.0, backend="jit").backend == "numpy"
+
+@pytest.mark.skipif(not os.path.isdir("/dev/shm"), reason="needs POSIX shared memory under /dev/shm")
+def test_failed_parallel_run_releases_shared_memory(tmp_path):
+    from qmc_cli import RunConfig, run_simulation
+    before = set(os.listdir("/dev/shm"))
+    config = RunConfig(particles=3, min_replicas=300, max_steps=20, backend="parallel", shard_workers=2, 
+                       checkpoint=str(tmp_path / "missing" / "run.npz"), checkpoint_every=5)
+    with pytest.raises(FileNotFoundError):
+        run_simulation(config) # the first checkpoint cannot be written
+    assert set(os.listdir("/dev/shm")) <= before
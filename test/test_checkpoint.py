@@ -0,0 +1,75 @@
+# checkpoint/restart: a run resumed from a checkpoint must finish exactly like the uninterrupted run
+
+import numpy as np
+import pytest
+
+from model import QMC
+from qmc_cli import RunConfig, run_simulation
+from trial_wavefunction import GaussianPairTrial
+from utils.potential import V_Gauss
+
+@pytest.mark.parametrize("backend", ["numpy", "jit", "parallel"])
+def test_resumed_run_matches_uninterrupted(backend, tmp_path):
+    if backend == "jit": pytest.importorskip("numba")
+    config = RunConfig(particles=3, min_replicas=400, max_replicas=2000, max_steps=300, samp_pct=0.5, seed=5, 
+                       backend=backend, shard_workers=2, checkpoint=str(tmp_path / "run.npz"), checkpoint_every=120, 
+                       density_out=str(tmp_path / "full.txt"))
+    full = run_simulation(config) # also leaves the checkpoint of step 240 behind
+
+    resumed = run_simulation(config.model_copy(update=dict(resume=config.checkpoint, checkpoint_every=0, 
+                                                           density_out=str(tmp_path / "resumed.txt"))))
+    np.testing.assert_array_equal(resumed, full)
+    assert np.array_equal(np.loadtxt(tmp_path / "resumed.txt"), np.loadtxt(tmp_path / "full.txt"))
+
+def test_resume_with_other_run_length_is_refused(tmp_path):
+    config = RunConfig(particles=2, min_replicas=200, max_steps=100, checkpoint=str(tmp_path / "run.npz"), checkpoint_every=50)
+    run_simulation(config)
+    with pytest.raises(ValueError, match="same -s"):
+        run_simulation(config.model_copy(update=dict(resume=config.checkpoint, checkpoint_every=0, max_steps=200)))
+
+def test_resume_without_the_target_error_is_refused(tmp_path):
+    config = RunConfig(particles=2, min_replicas=200, max_steps=400, target_error=0.001, checkpoint=str(tmp_path / "run.npz"), checkpoint_every=100)
+    run_simulation(config)
+    with pytest.raises(ValueError, match="--target-error"):
+        run_simulation(config.model_copy(update=dict(resume=config.checkpoint, checkpoint_every=0, target_error=None)))
+
+def test_resume_adds_missing_density(tmp_path):
+    config = RunConfig(particles=2, min_replicas=200, max_steps=100, samp_pct=0.5, checkpoint=str(tmp_path / "run.npz"), checkpoint_every=80)
+    run_simulation(config) # neither plots nor saves the density, so the checkpoint has no histogram
+    resumed = config.model_copy(update=dict(resume=config.checkpoint, checkpoint_every=0, density_out=str(tmp_path / "psi.txt"), hist_coords=True))
+    run_simulation(resumed)
+    columns = np.loadtxt(tmp_path / "psi.txt")
+    assert columns.shape == (config.bins, 3) and columns[:, 1].sum() > 0
+
+def test_trial_must_match_on_resume(tmp_path):
+    V, trial = V_Gauss(None, -4.0, 2.0), GaussianPairTrial(0.3)
+    qmc = QMC(V=V, particle_count=3, min_replicas=200, trial=trial)
+    for _ in range(10): qmc.step()
+    qmc.save_checkpoint(tmp_path / "run.npz")
+    for other in (None, GaussianPairTrial(0.4)): # plain DMC would branch on the saved local energies
+        with pytest.raises(ValueError, match="trial wave function"):
+            QMC.load_checkpoint(tmp_path / "run.npz", V, trial=other)
+    restored, _ = QMC.load_checkpoint(tmp_path / "run.npz", V, trial=GaussianPairTrial(0.3))
+    qmc.step()
+    restored.step()
+    assert restored.E_ref == qmc.E_ref
+
+@pytest.mark.parametrize("bit_generator", ["PCG64", "PCG64DXSM", "Philox", "SFC64", "MT19937"])
+def test_save_load_step_parity(bit_generator, tmp_path):
+    V = V_Gauss(None, -4.0, 2.0)
+    qmc = QMC(V=V, particle_count=3, min_replicas=300, seed=11, bit_generator=bit_generator)
+    for _ in range(10): qmc.step()
+    qmc.save_checkpoint(tmp_path / "run.npz")
+    restored, _ = QMC.load_checkpoint(tmp_path / "run.npz", V)
+    assert restored.bit_generator == bit_generator
+    for _ in range(20):
+        qmc.step()
+        restored.step()
+    assert (restored.E_ref, restored.N, restored.step_count) == (qmc.E_ref, qmc.N, qmc.step_count)
+    assert np.array_equal(restored.xs[:restored.N], qmc.xs[:qmc.N])
+
+def test_failed_checkpoint_leaves_no_temporary_file(tmp_path):
+    qmc = QMC(V=V_Gauss(None, -4.0, 2.0), particle_count=2, min_replicas=50)
+    with pytest.raises(Exception):
+        qmc.save_checkpoint(tmp_path / "run.npz", callback=lambda: None) # lambdas cannot be pickled
+    assert list(tmp_path.iterdir()) == []
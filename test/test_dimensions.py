@@ -0,0 +1,37 @@
+# dim > 1: walkers of shape (replicas, particle_count-1, dim) with Euclidean pair distances
+
+import numpy as np
+import pytest
+
+from model import QMC, pair_distances
+from ensemble import QMCEnsemble
+from trial_wavefunction import GaussianPairTrial
+from utils.potential import V_Gauss
+
+def test_pair_distances_are_euclidean():
+    xs = np.random.default_rng(0).normal(size=(5, 3, 2)) # 4 particles in 2D
+    positions = np.concatenate((np.zeros((5, 1, 2)), xs), axis=1)
+    expected = [sorted(np.linalg.norm(p[a] - p[b]) for a in range(4) for b in range(a + 1, 4)) for p in positions]
+    assert np.allclose(np.sort(pair_distances(xs), axis=1), expected)
+
+def test_3d_two_body_ground_state():
+    # exact E_0 of -1/2 laplacian - 4 exp(-r^2/4) in 3D (radial finite differences): -2.1229
+    V = V_Gauss(None, -4.0, 2.0)
+    qmc = QMC(V=V, dim=3, min_replicas=1000, max_replicas=4000, alpha=0.13, seed=1, trial=GaussianPairTrial.matched(V, 2, dim=3))
+    assert qmc.xs.shape == (4000, 1, 3)
+    E_refs = []
+    for step in range(600):
+        qmc.step()
+        if step >= 200: E_refs.append(qmc.E_ref)
+    assert np.mean(E_refs) == pytest.approx(-2.1229, abs=0.02)
+    hist, radii = qmc.Binning(radial=True)
+    assert hist[0].sum() == qmc.N and np.all(radii >= 0)
+
+def test_ensemble_matches_qmc_in_2d():
+    V = V_Gauss(None, -4.0, 2.0)
+    ensemble = QMCEnsemble(V, [dict(seed=3)], particle_count=3, min_replicas=200, dim=2)
+    qmc = QMC(V=V, particle_count=3, min_replicas=200, seed=3, dim=2)
+    for _ in range(50):
+        ensemble.step()
+        qmc.step()
+    assert ensemble.N[0] == qmc.N and ensemble.E_ref[0] == pytest.approx(qmc.E_ref, abs=1e-9)
@@ -0,0 +1,36 @@
+# QMCEnsemble: K configurations stepped together must follow the same trajectories as K separate QMC runs
+
+import numpy as np
+import pytest
+
+from model import QMC
+from ensemble import QMCEnsemble
+from utils.potential import V_Gauss
+
+def test_ensemble_matches_separate_runs():
+    V = V_Gauss(None, -4.0, 2.0)
+    configs = [dict(alpha=0.13, seed=1), dict(alpha=0.5, seed=1, spawn_key=(3,)), dict(alpha=0.2, seed=9, delta_tau=0.05)]
+    ensemble = QMCEnsemble(V, configs, particle_count=3, min_replicas=200, max_replicas=260)
+    runs = [QMC(V=V, particle_count=3, min_replicas=200, max_replicas=260, **config) for config in configs]
+    for _ in range(150):
+        ensemble.step()
+        for qmc in runs: qmc.step()
+    assert list(ensemble.N) == [qmc.N for qmc in runs]
+    assert list(ensemble.N_overflow) == [qmc.N_overflow for qmc in runs]
+    assert np.allclose(ensemble.E_ref, [qmc.E_ref for qmc in runs], rtol=0, atol=1e-9)
+
+def test_ensemble_stacks_potential_parameters():
+    ensemble = QMCEnsemble(V_Gauss(None, -4.0, 2.0), [dict(), dict(V0=-2.0, R=1.0)], min_replicas=200)
+    single = QMC(V=V_Gauss(None, -2.0, 1.0), min_replicas=200, seed=42)
+    assert ensemble.E_ref[1] == pytest.approx(single.E_ref)
+    assert ensemble.E_ref[0] == pytest.approx(-4.0)
+
+def test_ensemble_rejects_other_parameters():
+    with pytest.raises(ValueError):
+        QMCEnsemble(V_Gauss(None, -4.0, 2.0), [dict(particle_count=3)])
+
+def test_gda_scan_reports_options_it_cannot_honor():
+    from qmc_cli import RunConfig, ensemble_ignored_options
+    assert ensemble_ignored_options(RunConfig()) == []
+    config = RunConfig(target_error=0.01, tabulate_V=True, backend="jit", population_cache="cache")
+    assert ensemble_ignored_options(config) == ["--target-error", "--tabulate", "--backend", "--population-cache"]
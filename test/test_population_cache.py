@@ -0,0 +1,81 @@
+# PopulationCache: keyed storage of equilibrated walkers, n -> n+1 extension and LRU eviction
+
+import os
+
+import numpy as np
+import pytest
+
+from model import QMC
+from population_cache import PopulationCache
+from utils.potential import V_Gauss
+
+def test_store_load_and_extend(tmp_path):
+    cache = PopulationCache(str(tmp_path))
+    V = V_Gauss(None, -4.0, 2.0)
+    xs = np.random.default_rng(0).normal(size=(300, 1))
+    cache.store(V, 2, 0.1, xs)
+    assert np.array_equal(cache.load(V, 2, 0.1), xs)
+    assert cache.load(V, 2, 0.05) is None
+    assert cache.load(V_Gauss(None, -2.0, 2.0), 2, 0.1) is None
+
+    extended = cache.load(V, 3, 0.1, rng=np.random.default_rng(1))
+    assert extended.shape == (300, 2) and np.array_equal(extended[:, 0], xs[:, 0])
+
+    qmc = QMC(V=V, particle_count=3, min_replicas=500)
+    qmc.set_walkers(extended)
+    assert qmc.N == 500 and np.all(np.isin(qmc.xs[:500, 0], xs[:, 0]))
+    assert qmc.E_ref == pytest.approx(qmc.V_tots[:500].mean())
+
+def test_least_recently_used_is_evicted(tmp_path):
+    cache = PopulationCache(str(tmp_path))
+    V = V_Gauss(None, -4.0, 2.0)
+    xs = np.zeros((1000, 1))
+    for i, delta_tau in enumerate((0.1, 0.2, 0.3)):
+        cache.store(V, 2, delta_tau, xs)
+        os.utime(cache.path(cache.key(V, 2, delta_tau)), (i, i))
+    cache.load(V, 2, 0.1) # touching the oldest entry makes 0.2 the least recently used
+    cache.max_bytes = cache.size - 1
+    cache.evict()
+    assert cache.load(V, 2, 0.2) is None
+    assert cache.load(V, 2, 0.1) is not None and cache.load(V, 2, 0.3) is not None
+
+def test_extension_looks_up_the_smaller_run_under_its_own_trial(tmp_path):
+    from trial_wavefunction import GaussianPairTrial
+    cache = PopulationCache(str(tmp_path))
+    V = V_Gauss(None, -4.0, 2.0)
+    trial_2, trial_3 = GaussianPairTrial.matched(V, 2), GaussianPairTrial.matched(V, 3)
+    assert repr(trial_2) != repr(trial_3)
+    cache.store(V, 2, 0.1, np.zeros((100, 1)), trial_2)
+    rng = np.random.default_rng(0)
+    assert cache.load(V, 3, 0.1, trial_3, rng=rng, extend_trial=trial_3) is None
+    assert cache.load(V, 3, 0.1, trial_3, rng=rng, extend_trial=trial_2).shape == (100, 2)
+
+def test_failed_store_leaves_no_temporary_file(tmp_path, monkeypatch):
+    cache = PopulationCache(str(tmp_path))
+    def broken_savez(*args, **kwargs): raise OSError("disk full")
+    monkeypatch.setattr(np, "savez", broken_savez)
+    with pytest.raises(OSError):
+        cache.store(V_Gauss(None, -4.0, 2.0), 2, 0.1, np.zeros((100, 1)))
+    assert os.listdir(tmp_path) == []
+
+def test_entries_removed_by_another_process_are_skipped(tmp_path, monkeypatch):
+    cache = PopulationCache(str(tmp_path))
+    V = V_Gauss(None, -4.0, 2.0)
+    cache.store(V, 2, 0.1, np.zeros((100, 1)))
+    listdir = os.listdir
+    monkeypatch.setattr(os, "listdir", lambda path: listdir(path) + ["evicted.npz"])
+    assert cache.size > 0 and cache.load(V, 2, 0.1) is not None
+    cache.max_bytes = 0
+    cache.evict()
+    assert cache.size == 0 and cache.load(V, 2, 0.1) is None
+
+def test_potentials_with_other_parameters_do_not_share_entries(tmp_path):
+    from utils.potential import LocalPotential
+    class V_Wide(LocalPotential):
+        def __init__(self, V0):
+            super().__init__(None, "V_Wide")
+            self.V0 = V0
+    cache = PopulationCache(str(tmp_path))
+    cache.store(V_Wide(-1.0), 2, 0.1, np.zeros((100, 1)))
+    assert cache.load(V_Wide(-1.0), 2, 0.1) is not None
+    assert cache.load(V_Wide(-5.0), 2, 0.1) is None
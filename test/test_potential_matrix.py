@@ -0,0 +1,18 @@
+# bulk momentum-space matrix elements: Gauss-Legendre assembly against the closed form and against quad
+
+import numpy as np
+
+from utils.potential import V_Gauss, LocalPotential
+
+def test_quadrature_matches_closed_form_for_s_waves():
+    V = V_Gauss(None, -4.0, 2.0)
+    ps = np.linspace(1e-6, 10.0, 32)
+    exact = V.get_matrix(0, ps)
+    assert exact.shape == (32, 32)
+    assert np.allclose(LocalPotential.get_matrix(V, 0, ps), exact, rtol=0, atol=1e-5 * np.abs(exact).max())
+
+def test_quadrature_matches_quad_for_p_waves():
+    V = V_Gauss(None, -4.0, 2.0)
+    ps, qs = np.array([0.3, 1.0, 2.5]), np.array([0.5, 4.0])
+    expected = [[LocalPotential.get(V, 1, p, q) for q in qs] for p in ps]
+    assert np.allclose(V.get_matrix(1, ps, qs), expected, rtol=1e-5, atol=1e-6)
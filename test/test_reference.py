@@ -0,0 +1,45 @@
+# grid reference solver: converged E_0, normalized densities, memoization and trial fitting
+
+import pytest
+
+import reference
+from trial_wavefunction import GaussianPairTrial
+from utils.potential import V_Gauss
+from utils.system import System
+
+def test_physical_ground_states_match_test1():
+    V = V_Gauss(None, -4.0, 2.0)
+    assert reference.solve(V, 2).E_0 == pytest.approx(-3.094, abs=5e-4) # the n = 2 and n = 3 values quoted in test/test1.py
+    assert reference.solve(V, 3, h=0.2).E_0 == pytest.approx(-9.738, abs=5e-4)
+    assert reference.solve(V, 2, System(mass=2.0)).E_0 < reference.solve(V, 2).E_0 # heavier particles bind deeper
+    with pytest.raises(ValueError):
+        reference.solve(V, 2, hamiltonian="exact")
+
+def test_two_body_ground_state():
+    V = V_Gauss(None, -4.0, 2.0)
+    solution = reference.solve(V, 2, hamiltonian="model")
+    assert solution.E_0 == pytest.approx(-3.34004, abs=1e-4) # converged value (h -> 0)
+    assert reference.solve(V_Gauss(None, -4.0, 2.0), 2, hamiltonian="model") is solution
+    centers, density = solution.centroid_density(100, -20, 20)
+    assert density.sum() * (centers[1] - centers[0]) == pytest.approx(1.0, abs=1e-6)
+
+def test_three_body_ground_state_and_fitted_trial():
+    V = V_Gauss(None, -4.0, 2.0)
+    solution = reference.solve(V, 3, h=0.2, hamiltonian="model")
+    assert solution.psi.shape == (101, 101)
+    assert solution.E_0 == pytest.approx(-10.1886, abs=0.01)
+    assert reference.check(-10.19, 0.01, solution)[0] and not reference.check(-10.0, 0.01, solution)[0]
+    assert not reference.check(-10.19, 0.01, reference.solve(V_Gauss(None, -4.0, 2.0), 3, hamiltonian="physical"))[0]
+    assert 0.01 < GaussianPairTrial.fitted(solution).a < 2.0
+    with pytest.raises(ValueError):
+        reference.solve(V, 4)
+
+class V_Plain(V_Gauss):
+    """ V_Gauss with the base Potential repr: just the name, whatever V0 and R are. """
+    def __repr__(self):
+        return self.name
+
+def test_memo_tells_potential_parameters_apart():
+    shallow, deep = V_Plain(None, -1.0, 2.0), V_Plain(None, -4.0, 2.0)
+    assert repr(shallow) == repr(deep)
+    assert reference.solve(shallow, 2, h=0.2).E_0 > reference.solve(deep, 2, h=0.2).E_0
@@ -0,0 +1,18 @@
+# sweeps: every run gets its own child stream of the base seed, independent of the number of workers
+
+import numpy as np
+
+from model import QMC
+from qmc_cli import RunConfig, loop_particles
+from sweep import spawn_keys
+from utils.potential import V_Gauss
+
+def test_spawn_keys_give_the_seed_sequence_children():
+    children = np.random.SeedSequence(7).spawn(3)
+    for key, child in zip(spawn_keys(3), children):
+        qmc = QMC(V=V_Gauss(None, -4.0, 2.0), min_replicas=100, seed=7, spawn_key=key)
+        assert qmc.rng.random() == np.random.Generator(np.random.PCG64(child)).random()
+
+def test_sweep_results_do_not_depend_on_the_workers():
+    config = RunConfig(min_replicas=100, max_steps=50, seed=3)
+    np.testing.assert_array_equal(loop_particles(config, 3, workers=1), loop_particles(config, 3, workers=2))
@@ -0,0 +1,56 @@
+# tabulated potentials: build-time tolerance, exact fallback outside the table, return types and memoization
+
+import numpy as np
+import pytest
+
+from tabulated import TabulatedPotential, potential_key, tabulate
+from utils.potential import LocalPotential, V_Gauss
+
+class V_Wide(LocalPotential):
+    """ A potential without its own __repr__: repr gives only its name, whatever V0 is. """
+    def __init__(self, V0):
+        super().__init__(None, "V_Wide")
+        self.V0 = V0
+
+    def __call__(self, r):
+        return self.V0 * np.exp(-np.asarray(r)**2 / 9.0)
+
+@pytest.mark.parametrize("kind, tol", [("cubic", 1e-6), ("linear", 1e-4)])
+def test_error_within_tolerance(kind, tol):
+    V = V_Gauss(None, -4.0, 2.0)
+    table = TabulatedPotential(V, -20, 20, kind=kind, tol=tol)
+    assert table.error <= tol
+    xs = np.random.default_rng(0).uniform(-20, 20, 10000)
+    assert np.abs(table(xs) - V(xs)).max() <= tol
+
+def test_unreachable_tolerance_raises():
+    with pytest.raises(ValueError, match="Could not tabulate"):
+        TabulatedPotential(V_Gauss(None, -4.0, 2.0), -20, 20, kind="linear", tol=1e-12, max_points=4097)
+
+def test_exact_outside_the_table():
+    V = V_Gauss(None, -4.0, 2.0)
+    table = TabulatedPotential(V, -1, 1, kind="linear", tol=1e-3)
+    xs = np.array([-5.0, -1.5, 0.3, 1.5, 5.0])
+    outside = np.abs(xs) > 1
+    assert np.array_equal(table(xs)[outside], V(xs[outside]))
+    assert table(7.0) == V(7.0)
+
+def test_scalar_and_array_results():
+    table = TabulatedPotential(V_Gauss(None, -4.0, 2.0), -20, 20)
+    assert isinstance(table(0.5), float)
+    assert isinstance(table(50.0), float) # outside the table
+    values = table(np.zeros((3, 4)))
+    assert isinstance(values, np.ndarray) and values.shape == (3, 4)
+
+def test_tables_are_memoized():
+    table = tabulate(V_Gauss(None, -4.0, 2.0), -20, 20)
+    assert tabulate(V_Gauss(None, -4.0, 2.0), -20, 20) is table
+    assert tabulate(V_Gauss(None, -4.0, 2.0), -20, 20, tol=1e-4) is not table
+    assert tabulate(V_Gauss(None, -3.0, 2.0), -20, 20) is not table
+
+def test_tables_of_potentials_without_a_parameter_repr_are_separate():
+    assert tabulate(V_Wide(-1.0), -20, 20)(0.0) == pytest.approx(-1.0)
+    assert tabulate(V_Wide(-5.0), -20, 20)(0.0) == pytest.approx(-5.0)
+    assert potential_key(V_Wide(-1.0)) == potential_key(V_Wide(-1.0)) != potential_key(V_Wide(-5.0))
+    assert potential_key(tabulate(V_Wide(-1.0), -20, 20)) == potential_key(V_Wide(-1.0))
+    assert potential_key(lambda r: r) != potential_key(lambda r: 2 * r)
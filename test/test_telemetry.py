@@ -0,0 +1,31 @@
+# step observers: profiling must not change the simulation, and the branching counters must add up
+
+from model import QMC
+from telemetry import Profiler
+from utils.potential import V_Gauss
+
+def make_qmc():
+    return QMC(V=V_Gauss(None, -4.0, 2.0), particle_count=3, min_replicas=300, max_replicas=400, seed=3, alpha=0.13)
+
+def test_profiler_does_not_change_the_run():
+    plain, profiled = make_qmc(), make_qmc()
+    profiler = profiled.add_observer(Profiler())
+    for _ in range(100):
+        plain.step()
+        profiled.step()
+    assert plain.E_ref == profiled.E_ref and plain.N == profiled.N
+    assert len(profiler.rows) == 100 and set(profiler.phase_totals) >= {"Walk", "Branch", "CountReplicas"}
+
+def test_profiler_counters_balance(tmp_path):
+    qmc = make_qmc()
+    profiler = qmc.add_observer(Profiler())
+    N = qmc.N
+    for _ in range(100):
+        qmc.step()
+        row = profiler.rows[-1]
+        assert row["N"] == N - row["deaths"] + row["births"]
+        N = row["N"]
+    summary = profiler.summary()
+    assert summary["N_max"] == max(row["N"] for row in profiler.rows) <= qmc.capacity
+    profiler.write(tmp_path / "profile.csv")
+    assert len((tmp_path / "profile.csv").read_text().splitlines()) == 101
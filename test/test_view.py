@@ -0,0 +1,25 @@
+# plotting: long series are decimated without losing their extremes, and --plot-out writes files without a display
+
+import matplotlib
+matplotlib.use("Agg")
+import numpy as np
+
+import view
+
+def test_decimate_keeps_order_and_extremes():
+    xs = np.arange(10007)
+    ys = np.random.default_rng(1).standard_normal(len(xs))
+    dx, dy = view.decimate(xs, ys, 100)
+    assert len(dx) < 2 * 100 + 100
+    assert np.all(np.diff(dx) > 0)
+    assert np.array_equal(dy, ys[dx])
+    for bucket in range(100): # every bucket of the full series keeps its min and max
+        part = ys[bucket * 100:(bucket + 1) * 100]
+        assert part.min() in dy and part.max() in dy
+    assert view.decimate(xs[:150], ys[:150], 100)[0].shape == (150,) # short series are unchanged
+
+def test_plot_data_writes_file(tmp_path):
+    ys = -3.3 + 0.05 * np.random.default_rng(2).standard_normal(5000)
+    out = tmp_path / "qmc.svg"
+    view.plot_data(ys, None, (np.linspace(-1, 1, 10), np.ones(10)), 10, out=str(out))
+    assert out.read_text().lstrip().startswith("<?xml")